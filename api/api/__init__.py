@@ -1 +1,2 @@
 from .api import tvquiz_api
+from .api import try_reload_config
@@ -1,29 +1,99 @@
+import os
+import sys
 import asyncio
+from secrets import compare_digest
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from contextlib import asynccontextmanager
 from starlette.status import (
     HTTP_201_CREATED as _201,
-    HTTP_422_UNPROCESSABLE_ENTITY as _422
+    HTTP_403_FORBIDDEN as _403,
+    HTTP_404_NOT_FOUND as _404,
+    HTTP_422_UNPROCESSABLE_ENTITY as _422,
+    HTTP_500_INTERNAL_SERVER_ERROR as _500,
+    HTTP_503_SERVICE_UNAVAILABLE as _503
 )
 from starlette.requests import Request
 from starlette.websockets import WebSocketDisconnect
 from websockets.exceptions import ConnectionClosed
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Depends, FastAPI, WebSocket
+from fastapi import Depends, FastAPI, WebSocket, Header
 from fastapi.responses import JSONResponse
 from api.service import to_service
+from models import BatchMatches, BatchForms, BatchTests
 from util import to_multiplayer
+from util import to_readiness
+from util import to_static_cache
+from util import to_config_store
+from util import build_config
 from util import to_config
 
+# Token needed to reload data, or no reloads if unset
+ADMIN_TOKEN = 'TIC_KAN_TOE_ADMIN_TOKEN'
+# Serves the full config, if set
+DEBUG = 'TIC_KAN_TOE_DEBUG'
+
+def warm_up(readiness):
+    with readiness.phase('config'):
+        config = build_config()
+    with readiness.phase('service'):
+        service = to_service(config)
+    with readiness.phase('search'):
+        # Sample queries for every generation
+        for gen in config.generations:
+            # Newest mon visible in the generation
+            visible = config.gen_mon_ids[:config.gen_mon_ends[gen]]
+            for dexn in visible[-1:]:
+                name = config.mon_dict[dexn].name
+                service.get_matches(name, gen)
+                service.get_fuzzy_matches(name, gen)
+                service.get_forms(dexn, gen)
+    with readiness.phase('static'):
+        # Constants rendered as their endpoints serve them
+        static = to_static_cache()
+        static.to_entry(
+            config, ('latest_metadata',),
+            lambda: to_latest_metadata(config)
+        )
+        for gen in config.generations:
+            static.to_entry(
+                config, ('valid_combos', gen),
+                partial(to_valid_combos, config, gen)
+            )
+    return config
+
+def reload_config(readiness):
+    store = to_config_store()
+    # Build and warm up aside, then swap in at once
+    with store.lock_reload:
+        config = warm_up(readiness)
+        store.swap(config)
+    readiness.version = config.version
+    readiness.ready = True
+    return config
+
+def try_reload_config(readiness):
+    try:
+        return reload_config(readiness), None
+    except (ValueError, OSError) as e:
+        # Keep serving the current data
+        print(f'Reload failed: {e}', flush=True, file=sys.stderr)
+        return None, e
+
 @asynccontextmanager
 async def lifespan(
     _app: FastAPI
 ):
     # Initialize Multiplayer
     multiplayer = to_multiplayer()
-    # Any startup costs before yield
+    # Startup costs before accepting requests
+    readiness = to_readiness()
+    await asyncio.get_running_loop().run_in_executor(
+        None, reload_config, readiness
+    )
     yield
+    readiness.ready = False
     # Signal to stop worker 
     multiplayer.Q.put(None)
 
@@ -51,8 +121,46 @@ TODO: Documentation for Development
 '''
 
 @tvquiz_api.get("/api")
-def open_root_api(config=Depends(to_config)):
-    return { **vars(config) }
+def open_root_api(
+        request: Request,
+        config=Depends(to_config),
+        static=Depends(to_static_cache)
+    ):
+    if not os.environ.get(DEBUG):
+        return JSONResponse(
+            content={'detail': 'Not Found'}, status_code=_404
+        )
+    return static.respond(
+        request, config, ('root',), lambda: { **vars(config) }
+    )
+
+@tvquiz_api.get("/api/ready")
+def get_ready(readiness=Depends(to_readiness)):
+    status = readiness.to_status()
+    return JSONResponse(
+        content=status, status_code=(200 if status['ready'] else _503)
+    )
+
+@tvquiz_api.post("/api/admin/reload")
+def post_reload(
+        readiness=Depends(to_readiness),
+        x_admin_token: str | None = Header(None)
+    ):
+    token = os.environ.get(ADMIN_TOKEN)
+    if not token:
+        return JSONResponse(content={'reloaded': False}, status_code=_404)
+    if not compare_digest(
+        (x_admin_token or '').encode(), token.encode()
+    ):
+        return JSONResponse(content={'reloaded': False}, status_code=_403)
+    config, error = try_reload_config(readiness)
+    if error:
+        return JSONResponse(content={
+            'reloaded': False, 'error': str(error)
+        }, status_code=_500)
+    return {
+        'reloaded': True, 'version': config.version
+    }
 
 
 # Multiplayer support
@@ -88,55 +196,116 @@ async def websocket_endpoint(
 Constants
 '''
 
-@tvquiz_api.get("/api/latest_metadata")
-def get_latest_metadata(
-        config=Depends(to_config)
-    ):
+def to_latest_metadata(config):
     return {
         'defaults': {
             'max_gen': config.default_max_gen,
         }
     }
 
+def to_valid_combos(config, max_gen):
+    return [
+        { 'combo': combo } for combo in config.valid_combos[max_gen]
+    ]
+
+@tvquiz_api.get("/api/latest_metadata")
+def get_latest_metadata(
+        request: Request,
+        config=Depends(to_config),
+        static=Depends(to_static_cache)
+    ):
+    return static.respond(
+        request, config, ('latest_metadata',),
+        lambda: to_latest_metadata(config)
+    )
+
 
 @tvquiz_api.get("/api/valid_combos")
 def get_valid_combos(
+        request: Request,
         config=Depends(to_config),
+        static=Depends(to_static_cache),
         max_gen: int | None = None
     ):
     gens = config.generations
-    combos = config.valid_combos[(
-        max_gen if max_gen in gens else max(gens)
-    )]
-    return [
-        { 'combo': combo } for combo in combos 
-    ]
+    max_gen = max_gen if max_gen in gens else max(gens)
+    return static.respond(
+        request, config, ('valid_combos', max_gen),
+        lambda: to_valid_combos(config, max_gen)
+    )
 
 
 '''
 Pokemon forms and search
 '''
 
+def find_forms(service, dexn, max_gen):
+    if not dexn:
+        return []
+    _, forms = service.get_forms(dexn, max_gen)
+    return forms
+
+def find_matches(config, service, guess, max_gen, fuzzy):
+    gens = config.generations
+    if max_gen not in gens:
+        max_gen = max(gens)
+    # Allow typos, ranked by edit distance
+    if fuzzy:
+        return service.get_fuzzy_matches(guess, max_gen)
+    return service.get_matches(guess, max_gen)
+
 @tvquiz_api.get("/api/forms")
 def get_forms(
         config=Depends(to_config),
         dexn: int | None = None,
         max_gen: int | None = None
     ):
-    if not dexn:
-        return []
-    _, forms = to_service(config).get_forms(dexn, max_gen)
-    return forms
+    return find_forms(to_service(config), dexn, max_gen)
+
+@tvquiz_api.get("/api/stats")
+def get_stats(config=Depends(to_config)):
+    # Counts since the current data was loaded
+    return {
+        'matches': to_service(config).match_cache.to_stats()
+    }
 
 @tvquiz_api.get("/api/matches")
 def get_matches(
         config=Depends(to_config), guess: str = '',
-        max_gen: int | None = None
+        max_gen: int | None = None, fuzzy: bool = False
     ):
-    gens = config.generations
-    if max_gen not in gens:
-        max_gen = max(gens)
-    return to_service(config).get_matches(guess, max_gen)
+    return find_matches(
+        config, to_service(config), guess, max_gen, fuzzy
+    )
+
+'''
+Many searches or forms in one request
+'''
+
+@tvquiz_api.post("/api/batch/forms")
+def post_batch_forms(
+        batch: BatchForms,
+        config=Depends(to_config)
+    ):
+    service = to_service(config)
+    return [
+        find_forms(service, query.dexn, query.max_gen)
+        for query in batch.queries
+    ]
+
+@tvquiz_api.post("/api/batch/matches")
+def post_batch_matches(
+        batch: BatchMatches,
+        config=Depends(to_config)
+    ):
+    service = to_service(config)
+    return [
+        find_matches(
+            config, service, query.guess,
+            query.max_gen, query.fuzzy
+        )
+        for query in batch.queries
+    ]
 
 '''
 Validate guess on specific form
@@ -148,11 +317,15 @@ def run_test(
         form_id: int | None = None,
         conditions: str = ''
     ):
-    # Comparison against conditions
-    def str_cmp(x,y):
-        return x.lower() == y.lower()
-    fns = [
-        (s, lambda x,arr: any(str_cmp(x,y) for y in arr))
-        for s in conditions.split(',')
+    return to_service(config).run_test(form_id, conditions)
+
+@tvquiz_api.post("/api/batch/test")
+def post_batch_test(
+        batch: BatchTests,
+        config=Depends(to_config)
+    ):
+    service = to_service(config)
+    return [
+        service.run_test(query.form_id, query.conditions)
+        for query in batch.queries
     ]
-    return to_service(config).run_test(form_id, fns)
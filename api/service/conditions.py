@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+# Condition strings remembered per service
+CONDITION_CACHE_SIZE = 4096
+
+class Conditions:
+    def __init__(self, vocabulary):
+        # One bit per known condition
+        self.bits = dict()
+        for name in vocabulary:
+            self.bits.setdefault(name.lower(), 1 << len(self.bits))
+        self.compile = lru_cache(maxsize=CONDITION_CACHE_SIZE)(
+            self.to_mask
+        )
+
+    def to_criteria_mask(self, criteria):
+        mask = 0
+        for name in criteria:
+            mask |= self.bits[name.lower()]
+        return mask
+
+    def to_mask(self, conditions):
+        mask = 0
+        for s in conditions.split(','):
+            bit = self.bits.get(s.lower())
+            # Unknown conditions are never met
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
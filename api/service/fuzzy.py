@@ -0,0 +1,67 @@
+def levenshtein(a, b):
+    # Shared prefix and suffix cost no edits
+    n_shared = min(len(a), len(b))
+    start = 0
+    while start < n_shared and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < n_shared - start and a[-1-end] == b[-1-end]:
+        end += 1
+    a, b = a[start:len(a)-end], b[start:len(b)-end]
+    if not a or not b:
+        return len(a) + len(b)
+    # Two rows of the edit distance table
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1, current[j-1] + 1,
+                previous[j-1] + (ca != cb)
+            ))
+        previous = current
+    return previous[-1]
+
+# Most typos indexed per name
+MAX_DIST = 2
+
+def to_max_dist(n_chars):
+    # More typos allowed in longer guesses
+    return 1 if n_chars <= 4 else MAX_DIST
+
+def to_deletes(word, max_dist):
+    # The word with up to max_dist letters removed
+    found = { word }
+    deletes = { word }
+    for _ in range(max_dist):
+        deletes = {
+            d[:i] + d[i+1:] for d in deletes
+            for i in range(len(d))
+        }
+        found |= deletes
+    return found
+
+class DeleteIndex:
+    # Words within max_dist edits share a delete
+    def __init__(self, words, max_dist=MAX_DIST):
+        self.max_dist = max_dist
+        self.max_len = 0
+        self.deletes = dict()
+        for word in words:
+            self.max_len = max(self.max_len, len(word))
+            for delete in to_deletes(word, max_dist):
+                self.deletes.setdefault(delete, []).append(word)
+
+    def search(self, word, max_dist):
+        max_dist = min(max_dist, self.max_dist)
+        # Too long to be within max_dist of any word
+        if len(word) > self.max_len + max_dist:
+            return
+        candidates = {
+            found for delete in to_deletes(word, max_dist)
+            for found in self.deletes.get(delete, [])
+        }
+        for found in candidates:
+            dist = levenshtein(word, found)
+            if dist <= max_dist:
+                yield dist, found
@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+
+# Guesses remembered per service
+MATCH_CACHE_SIZE = 4096
+
+class MatchCache:
+    def __init__(self, size=MATCH_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counts = { 'hits': 0, 'refines': 0, 'misses': 0 }
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def find_prefix(self, guess, max_gen, min_chars):
+        # Longest cached guess that this guess extends
+        for end in range(len(guess) - 1, min_chars - 1, -1):
+            entry = self.get((guess[:end], max_gen))
+            if entry is not None:
+                return entry
+        return None
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def count(self, kind):
+        with self.lock:
+            self.counts[kind] += 1
+
+    def to_stats(self):
+        with self.lock:
+            total = sum(self.counts.values())
+            return {
+                **self.counts,
+                'entries': len(self.entries),
+                'size': self.size,
+                'hit_rate': (
+                    self.counts['hits'] / total if total else 0.0
+                )
+            }
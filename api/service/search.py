@@ -0,0 +1,91 @@
+import heapq
+from bisect import bisect_left
+from itertools import islice
+
+# Longest n-gram compared between names
+MAX_N = 6
+
+def quality(offset, n, count):
+    is_first = offset == 0
+    scales = [
+        [0, 0], [10*2**n, n]
+    ][+(n>0)]
+    values = [is_first, count]
+    ranking = zip(scales, values)
+    return sum(p*v for p,v in ranking)
+
+def to_ngrams(s,n):
+    for start in range(0, len(s) - n + 1):
+        yield s[start:start+n]
+
+def to_first_offsets(s, n):
+    # Each n-gram with the offset where it first occurs
+    offsets = {}
+    for start, ngram in enumerate(to_ngrams(s, n)):
+        offsets.setdefault(ngram, start)
+    return offsets
+
+class SearchIndex:
+    def __init__(self, name_dict):
+        self.offsets = {
+            k: tuple(
+                to_first_offsets(name, n)
+                for n in range(1, MAX_N + 1)
+            )
+            for k, name in name_dict.items()
+        }
+
+    def to_quality(self, guess_ngrams, k):
+        # Longest shared n-grams decide the quality
+        for n in range(MAX_N, 0, -1):
+            offsets = self.offsets[k][n-1]
+            union = guess_ngrams[n-1] & offsets.keys()
+            if not union: continue
+            return quality(
+                min(offsets[ngram] for ngram in union),
+                n, len(union)
+            )
+        return quality(0, 0, 0)
+
+    def top_k(self, guess, candidates, k):
+        guess_ngrams = [
+            set(to_ngrams(guess, n)) for n in range(1, MAX_N + 1)
+        ]
+        # Same order as a stable sort, highest quality first
+        return heapq.nlargest(
+            k, candidates,
+            key=lambda c: self.to_quality(guess_ngrams, c)
+        )
+
+class FormIndex:
+    def __init__(self, mons):
+        # Names of forms not named after their mon
+        self.names = []
+        # Mons and forms by each token new to a form's name
+        self.aliases = dict()
+        for mon in mons:
+            species = set(mon.name.split('-'))
+            for form in mon.forms:
+                if form.name == mon.name: continue
+                self.names.append((
+                    form.name, len(mon.name), mon.id, form.form_id
+                ))
+                for token in form.name.split('-'):
+                    if not token or token in species: continue
+                    self.aliases.setdefault(token, []).append(
+                        (mon.id, form.form_id)
+                    )
+        self.names.sort()
+        self.keys = [name for name, *_ in self.names]
+
+    def find(self, guess):
+        # Form names the guess starts, past the mon's name
+        start = bisect_left(self.keys, guess)
+        for name, n_mon_chars, mon_id, form_id in islice(
+            self.names, start, None
+        ):
+            if not name.startswith(guess): break
+            if len(guess) > n_mon_chars:
+                yield mon_id, form_id
+        # Forms with the guess as a whole token
+        yield from self.aliases.get(guess, [])
@@ -1,33 +1,29 @@
+import heapq
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 from util import (
-    id_from_url, to_form_generations,
-    to_form_region_no_gimmicks, get_api
+    id_from_url, get_api, WORKERS
 )
+from .search import quality, to_ngrams, SearchIndex, FormIndex
+from .fuzzy import DeleteIndex, to_max_dist
+from .match_cache import MatchCache
+from .conditions import Conditions
 
-def get_pages(root, endpoint, offset=None):
-    off = f"&offset={offset}" if offset else ""
-    page_list = get_api(root, f'/{endpoint}/?limit=1000{off}')
-    while page_list["next"] is not None:
-        next_list = get_api(
-            root, f'/{endpoint}/?{urlparse(page_list["next"]).query}'
-        )
-        page_list["results"].append(next_list["results"])
-        page_list["next"] = next_list["next"]
-
-    return page_list
-
-def quality(offset, n, count):
-    is_first = offset == 0
-    scales = [
-        [0, 0], [10*2**n, n]
-    ][+(n>0)]
-    values = [is_first, count]
-    ranking = zip(scales, values)
-    return sum(p*v for p,v in ranking)
+# Most Pokemon in any search
+MAX_FETCHES = 10
 
-def to_ngrams(s,n):
-    for start in range(0, len(s) - n + 1):
-        yield s[start:start+n]
+def yield_pages(root, endpoint, limit=1000):
+    query = f'limit={limit}'
+    while query is not None:
+        page = get_api(root, f'/{endpoint}/?{query}', fresh=True)
+        yield from page["results"]
+        query = (
+            urlparse(page["next"]).query
+            if page["next"] is not None else None
+        )
 
 def to_ngram_union(guess, target, n):
     ngrams_guess = set(to_ngrams(guess, n))
@@ -49,17 +45,6 @@ def fast_dist(guess, target):
 
     return found 
 
-def str_dist(guess, target):
-
-    found = (0, 0, 0)
-
-    for n in [1,2,3,4,5,6]:
-        (union, offset) = to_ngram_union(guess, target, n)
-        if len(union) == 0: continue
-        found = (offset, n, len(union))
-
-    return found 
-
 def format_mon(mon, forms):
     pokemon = {
         'forms': forms,
@@ -75,8 +60,15 @@ class Service():
     def __init__(self, config):
         by_game_group = config.dex_map.by_game_group
         self.form_mon_dict = config.form_mon_dict
-        self.gen_form_dict = config.gen_form_dict
-        self.gen_mon_dict = config.gen_mon_dict
+        self.form_dict = config.form_dict
+        self.form_table = config.form_table
+        self.mon_dict = config.mon_dict
+        self.form_gens = config.form_gens
+        self.mon_gens = config.mon_gens
+        self.search_gens = config.search_gens
+        self.gen_mon_ids = config.gen_mon_ids
+        self.gen_mon_ends = config.gen_mon_ends
+        self.mon_index = config.mon_index
         self.by_game_group = by_game_group
         self.generations = config.generations
         self.mon_name_dict = config.mon_name_dict
@@ -85,113 +77,208 @@ class Service():
         self.two_grams = config.two_grams
         self.api_url = config.api_url
         self.MONO = config.MONO
+        self.search_index = SearchIndex(self.mon_name_dict)
+        self.form_index = FormIndex(config.mons)
+        # Mons by their own and their forms' names
+        self.name_mons = dict()
+        for mon in config.mons:
+            for name in [mon.name] + [f.name for f in mon.forms]:
+                mon_ids = self.name_mons.setdefault(name, [])
+                if mon.id not in mon_ids: mon_ids.append(mon.id)
+        self.name_index = DeleteIndex(self.name_mons.keys())
+        self.match_cache = MatchCache()
+        # Formatted forms of every mon in every generation
+        self.form_lists = dict(self.to_form_lists(config.mons))
+        # Criteria of every form, also as a bitmask
+        self.form_criteria = {
+            form_id: self.to_criteria(form)
+            for form_id, form in self.form_dict.items()
+        }
+        self.conditions = Conditions([
+            name for criteria in self.form_criteria.values()
+            for name in criteria
+        ])
+        self.form_masks = {
+            form_id: self.conditions.to_criteria_mask(criteria)
+            for form_id, criteria in self.form_criteria.items()
+        }
 
     @staticmethod 
     def update_games(root, games):
-        new_ver_list = get_pages(
-            root, 'version-group', len(games)
+        newest = max((game[0] for game in games), default=0)
+        # Only version groups newer than those known
+        new_ver_ids = (
+            ver_id for ver_id in (
+                id_from_url(ver_info['url'])
+                for ver_info in yield_pages(root, 'version-group')
+            )
+            if ver_id > newest
         )
+        def get_version(ver_id):
+            return ver_id, get_api(root, f'/version-group/{ver_id}')
         version_list = [ *games ]
-        for ver_info in new_ver_list["results"]:
-            ver_id = id_from_url(ver_info['url'])
-            ver = get_api(root, f'/version-group/{ver_id}')
-            version_list.append(tuple([
-                ver_id,
-                id_from_url(ver["generation"]["url"]), [
-                    id_from_url(dex["url"]) 
-                    for dex in ver["pokedexes"]
-                ], [
-                    region["name"] for region in ver["regions"]
-                ]
-            ]))
-            print('Adding', ver['name'])
+        # Fetch details while later pages stream in
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for ver_id, ver in pool.map(get_version, new_ver_ids):
+                version_list.append(tuple([
+                    ver_id,
+                    id_from_url(ver["generation"]["url"]), [
+                        id_from_url(dex["url"]) 
+                        for dex in ver["pokedexes"]
+                    ], [
+                        region["name"] for region in ver["regions"]
+                    ]
+                ]))
+                print('Adding', ver['name'])
         return version_list
 
-    def run_test(self, form_id, fns):
-        if form_id is None:
-            return { 'ok': False }
-        # Maximum maximum generation
-        max_gen = max(self.generations)
-        form = self.get_form(form_id, max_gen)
+    def to_criteria(self, form):
         # Form type conditions
         types = self.type_combos[form.type_combo]
-        mon = self.form_mon_dict[form.form_id]
         ok_criteria = list(types) + [
             self.MONO for _ in [ types ]
             if len(types) == 1
         ]
         # First region condition
         ok_criteria += [
-            to_form_region_no_gimmicks(
-                mon, self.by_game_group, form, 'SOME'
-            )
+            region for region in [
+                self.form_table[form.form_id].first_region
+            ] if region
         ]
+        return ok_criteria
+
+    def run_test(self, form_id, conditions):
+        # Unknown forms pass no conditions
+        if form_id not in self.form_masks:
+            return { 'ok': False }
+        # Maximum maximum generation
+        max_gen = max(self.generations)
+        form = self.get_form(form_id, max_gen)
         # Evaluate against valid conditions
-        ok = all(
-            fn(s, ok_criteria) for (s, fn) in fns
+        mask = self.conditions.compile(conditions)
+        ok = (
+            mask is not None and
+            self.form_masks[form_id] & mask == mask
         )
         if ok:
-            ok_str = ','.join(ok_criteria)
+            ok_str = ','.join(self.form_criteria[form_id])
             print(f'{form.name}: {ok_str}')
         return { 'ok': ok }
 
+    def is_visible(self, origin_gen, max_gen):
+        # Nothing is visible in unknown generations
+        if max_gen not in self.gen_mon_ends:
+            return False
+        return origin_gen <= max_gen
+
     def get_mon(self, dexn, max_gen):
         try:
-            return self.gen_mon_dict[max_gen][dexn]
+            if not self.is_visible(self.mon_gens[dexn], max_gen):
+                raise KeyError(dexn)
+            return self.mon_dict[dexn]
         except KeyError as e:
             print(e)
             return None
 
+    def to_form_lists(self, mons):
+        for mon in mons:
+            formatted_forms = [
+                {
+                    'name': form.name,
+                    'id': form.form_id,
+                    'mon_id': form.mon_id,
+                    'generation': self.form_gens[form.form_id],
+                }
+                for form in mon.forms
+            ]
+            for max_gen in self.generations:
+                if not self.is_visible(self.mon_gens[mon.id], max_gen):
+                    continue
+                yield (mon.id, max_gen), (mon, [
+                    form for form in formatted_forms
+                    if form['generation'] <= max_gen
+                ])
+
     def get_forms(self, dexn, gen=None):
         max_gen = gen or max(self.generations)
-        mon = self.get_mon(dexn, max_gen)
-        if not mon: return None, []
-        filtered_forms = [
-            {
-                'name': form.name,
-                'id': form.form_id,
-                'mon_id': form.mon_id,
-                'generation': min(to_form_generations(
-                    self.by_game_group, form, 'SOME'
-                )),
-            }
-            for form in mon.forms if (
-                form.form_id in self.gen_form_dict[max_gen]
-            )
-        ]
-        return mon, filtered_forms
+        found = self.form_lists.get((dexn, max_gen))
+        if found: return found
+        # Reports the mon missing in this generation
+        self.get_mon(dexn, max_gen)
+        return None, []
 
     def get_form(self, form_id, max_gen):
-        return self.gen_form_dict[max_gen][form_id]
+        if not self.is_visible(self.form_gens[form_id], max_gen):
+            raise KeyError(form_id)
+        return self.form_dict[form_id]
+
+    def to_gram(self, prefix, max_gen):
+        return [
+            k for k in self.three_grams.get(prefix, [])
+            if self.search_gens[k] <= max_gen
+        ]
+
+    def to_two_gram(self, prefix, max_gen):
+        grams = [
+            gram for gram in (
+                self.to_gram(k, max_gen)
+                for k in self.two_grams.get(prefix, [])
+            ) if gram
+        ]
+        # In order of each prefix's first visible mon
+        grams.sort(key=lambda gram: self.mon_index[gram[0]])
+        return [k for gram in grams for k in gram]
+
+    def to_candidates(self, guess, max_gen):
+        # Pokemon with same first 3 letters
+        three = self.to_gram(guess[:3], max_gen)
+        # Pokemon with same first 2 letters
+        two = self.to_two_gram(guess[:2], max_gen)
+        return len(three), two
+
+    def to_form_hits(self, guess, max_gen):
+        hits = []
+        for dexn, form_id in self.form_index.find(guess):
+            found = self.form_lists.get((dexn, max_gen))
+            if not found or dexn in (mon.id for mon, _ in hits):
+                continue
+            mon, forms = found
+            # The named form first, if in this generation
+            named = [form for form in forms if form['id'] == form_id]
+            if not named: continue
+            hits.append((mon, named + [
+                form for form in forms if form['id'] != form_id
+            ]))
+        return hits
 
     def get_matches(self, raw_guess, max_gen):
 
         # No matches for 1 or 2 chars
         guess = raw_guess.lower()
-        n_chars = len(guess)
-        if n_chars <= 2:
+        if len(guess) <= 2:
             return []
 
-        # Pokemon with same first 3 letters
-        three = self.three_grams[max_gen].get(guess[:3], [])
-        # Pokemon with same first 2 letters
-        two = self.two_grams[max_gen].get(guess[:2], [])
-
-        # Sort two-gram pokemon by match quality
-        favored = sorted(
-            two, reverse=True,
-            key=lambda k: quality(*str_dist(guess, self.mon_name_dict[k]))
-        )
-        # List of all other pokemon
-        # Sort other pokemon less exactly
-        other = sorted(
-            list(
-                set(self.gen_mon_dict[max_gen].keys()) - set(two)
-            ),
-            reverse=True,
-            key=lambda k: quality(*fast_dist(guess, self.mon_name_dict[k]))
-        )
+        key = (guess, max_gen)
+        cache = self.match_cache
+        entry = cache.get(key)
+        if entry is not None:
+            cache.count('hits')
+            return entry[1]
+        # Candidates depend only on the first 3 letters,
+        # so are shared with any shorter cached guess
+        entry = cache.find_prefix(guess, max_gen, 3)
+        if entry is not None:
+            cache.count('refines')
+            candidates = entry[0]
+        else:
+            cache.count('misses')
+            candidates = self.to_candidates(guess, max_gen)
+        matches = self.rank_matches(guess, max_gen, *candidates)
+        cache.put(key, (candidates, matches))
+        return matches
 
+    def rank_matches(self, guess, max_gen, n_three, two):
+        n_chars = len(guess)
         out = []
         # Examples of trigrams:
         # common: cha, mag, dra, iro
@@ -205,8 +292,23 @@ class Service():
         n_fetches, n_partial = (3, 0)
         # More matches for long strings 
         if n_chars > 3:
-            n_fetches = clamp(len(three), 5, 10)
+            n_fetches = clamp(n_three, 5, MAX_FETCHES)
             #n_partial = clamp(len(two), 2, 10)
+
+        # Best two-gram pokemon by match quality
+        favored = self.search_index.top_k(
+            guess, two, n_fetches + n_partial
+        )
+        # List of all other pokemon, only if needed
+        # Sort other pokemon less exactly
+        other = [] if not n_partial else heapq.nlargest(
+            n_partial, list(
+                set(self.gen_mon_ids[
+                    :self.gen_mon_ends[max_gen]
+                ]) - set(two)
+            ),
+            key=lambda k: quality(*fast_dist(guess, self.mon_name_dict[k]))
+        )
         
         # Fetch some favored pokemon
         for _ in range(n_fetches):
@@ -222,11 +324,77 @@ class Service():
         for dexn in (favored + other)[:n_partial]:
             mon = self.get_mon(dexn, max_gen)
             if mon: out.append((mon, []))
+
+        # Pokemon with forms named by the guess go first
+        hits = self.to_form_hits(guess, max_gen)
+        if hits:
+            out = (hits + [
+                (mon, forms) for mon, forms in out
+                if mon.id not in (hit.id for hit, _ in hits)
+            ])[:MAX_FETCHES]
         
         return [
             format_mon(mon, forms) for mon, forms in out
         ]
 
 
+    def get_fuzzy_matches(self, raw_guess, max_gen):
+
+        # No matches for 1 or 2 chars
+        guess = raw_guess.lower()
+        n_chars = len(guess)
+        if n_chars <= 2:
+            return []
+
+        # Closest edit distance of each mon's names
+        found = dict()
+        for dist, name in self.name_index.search(
+            guess, to_max_dist(n_chars)
+        ):
+            for dexn in self.name_mons[name]:
+                found[dexn] = min(dist, found.get(dexn, dist))
+        ranked = sorted(
+            found, key=lambda k: (found[k], self.mon_index[k])
+        )
+
+        # Few matches for short strings
+        n_fetches = 3 if n_chars <= 3 else MAX_FETCHES
+        out = []
+        for dexn in ranked:
+            if len(out) >= n_fetches: break
+            found_forms = self.form_lists.get((dexn, max_gen))
+            if found_forms: out.append(found_forms)
+
+        return [
+            format_mon(mon, forms) for mon, forms in out
+        ]
+
+
+class Services:
+    def __init__(self, size=2):
+        self.size = size
+        self.services = OrderedDict()
+        self.lock = threading.Lock()
+
+    def to_service(self, config):
+        key = id(config)
+        with self.lock:
+            found = self.services.get(key)
+            if found and found[0] is config:
+                self.services.move_to_end(key)
+                return found[1]
+        service = Service(config)
+        with self.lock:
+            self.services[key] = (config, service)
+            # Previous service stays, for requests in flight
+            while len(self.services) > self.size:
+                self.services.popitem(last=False)
+        return service
+
+@lru_cache()
+def to_services():
+    return Services()
+
 def to_service(config):
-    return Service(config)
+    # One service per loaded config
+    return to_services().to_service(config)
@@ -1,19 +1,26 @@
 import sys
 import ssl
 import signal
+import traceback
 from pathlib import Path
 from argparse import ArgumentParser
 import asyncio
+from itertools import count
 import uvicorn
 from util import (
-    set_config, describe_mon, describe_type_combos,
-    read_extra_form_name_dict, read_form_count_list,
-    read_form_index_list, read_type_combos, read_game_list
+    set_config, describe_mons, describe_type_combos,
+    to_type_combo_map, to_added_types, describe_type_mon_ids,
+    yield_alt_forms, read_mon_list,
+    read_type_combos, read_game_list,
+    to_api_cache, read_journal, open_journal, clear_journal,
+    to_readiness
 )
 from models import (
-    unpackage_mon_list 
+    unpackage_mon_list, package_form_lists,
+    remap_form_index_list
 )
 from api.service import Service 
+from api import try_reload_config
 
 CERT_ROOT = Path('/etc/letsencrypt/live/')
 
@@ -24,6 +31,18 @@ parser = ArgumentParser(
 parser.add_argument('--cert-name', type=str)
 parser.add_argument('--ui-port', type=int, default=3134)
 parser.add_argument('--default-max-gen', type=int, default=1)
+parser.add_argument(
+    '--offline', action='store_true',
+    help='Only use cached PokéAPI responses'
+)
+parser.add_argument(
+    '--cache-ttl', type=float,
+    help='Seconds before cached responses are revalidated'
+)
+parser.add_argument(
+    '--update-only', action='store_true',
+    help='Save updated data without serving, for a reload'
+)
 
 def to_server(pem_path, port, module, scope, log_level):
     print(f'Running {scope} {module} on port {port}')
@@ -60,6 +79,13 @@ def to_server(pem_path, port, module, scope, log_level):
     return Server(config)
 
 
+def log_reload_error(future):
+    # Errors try_reload_config does not expect
+    if future.cancelled() or not future.exception():
+        return
+    print('Reload failed:', file=sys.stderr)
+    traceback.print_exception(future.exception(), file=sys.stderr)
+
 async def run_tasks(ports, pem_path):
 
     asyncio.get_event_loop()
@@ -79,6 +105,17 @@ async def run_tasks(ports, pem_path):
         api_server.should_exit = True
         client_server.should_exit = True
     signal.signal(signal.SIGINT, signal_handler)
+    # Reload saved data without dropping connections
+    loop = asyncio.get_running_loop()
+    def reload_in_executor():
+        future = loop.run_in_executor(
+            None, try_reload_config, to_readiness()
+        )
+        future.add_done_callback(log_reload_error)
+    def reload_handler(_s,_f):
+        loop.call_soon_threadsafe(reload_in_executor)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, reload_handler)
     await asyncio.gather(*tasks)
     print('\nClosed servers')    
 
@@ -93,50 +130,128 @@ def types_changed(old_type_combos, new_type_combos):
 def update_type_combos(api_url):
     old_type_combos = list(read_type_combos())
     new_type_combos = describe_type_combos(api_url)
-    return new_type_combos, types_changed(
+    return old_type_combos, new_type_combos, types_changed(
         old_type_combos, new_type_combos
     )
 
-def start_servers(args, **config_kwargs):
+def save_updates(args, **config_kwargs):
     ports = {
         'client': args.ui_port,
         'api': args.ui_port + 1
     }
-    pem_path = (
-        CERT_ROOT / args.cert_name
-        if args.cert_name else None
-    )
     set_config(**{
         **config_kwargs, 'ports': ports,
         'default_max_gen': args.default_max_gen
     })
+    # Journaled Pokémon are now in the saved lists
+    clear_journal()
+    return ports
+
+def start_servers(args, **config_kwargs):
+    pem_path = (
+        CERT_ROOT / args.cert_name
+        if args.cert_name else None
+    )
+    ports = save_updates(args, **config_kwargs)
     asyncio.run(run_tasks(ports, pem_path))
 
 
-def load_updates(api_url):
-    extra_form_name_dict = read_extra_form_name_dict()
-    type_combos, found_new_types = update_type_combos(api_url)
-    # Must clear cache of all pokemon data if new types found
-    mon_list = [] if found_new_types else list(unpackage_mon_list(
-        list(read_form_count_list()),
-        list(read_form_index_list()),
+def remap_mon_list(mon_list, extra_form_name_dict, type_combo_map):
+    form_index_list, form_count_list = (
+        package_form_lists(mon_list)
+    )
+    stale_dexns = remap_form_index_list(
+        form_count_list, form_index_list, type_combo_map
+    )
+    return list(unpackage_mon_list(
+        form_count_list, form_index_list,
         extra_form_name_dict
-    ))
+    )), stale_dexns
+
+def to_retyped_dexns(api_url, mon_list, added_types):
+    # Pokémon that may have been retyped with new types
+    dexn_by_mon_id = {
+        form.mon_id: dexn
+        for dexn, mon in enumerate(mon_list, 1)
+        for form in mon.forms
+    }
+    stale_dexns = []
+    for type_name in added_types:
+        print(f'Finding Pokémon with new type {type_name}')
+        stale_dexns += [
+            dexn_by_mon_id[mon_id] for mon_id
+            in describe_type_mon_ids(api_url, type_name)
+            if mon_id in dexn_by_mon_id
+        ]
+    return stale_dexns
+
+def refetch_stale_mons(
+    api_url, stale_dexns, type_combos,
+    mon_list, extra_form_name_dict
+):
+    # Refetch Pokémon with forms of removed or new types
+    stale_dexns = sorted(set(stale_dexns))
+    if not stale_dexns:
+        return
+    for dexn, name, mon, extra_forms in describe_mons(
+        stale_dexns, type_combos, api_url
+    ):
+        mon_list[dexn-1] = mon
+        print(f'Reloaded Pokémon #{dexn} {name}')
+        for form_id, name in extra_forms:
+            extra_form_name_dict[form_id] = name
+
+def load_updates(api_url):
+    old_type_combos, type_combos, found_new_types = (
+        update_type_combos(api_url)
+    )
+    mon_list = list(read_mon_list())
+    extra_form_name_dict = dict(
+        alt_form for mon in mon_list
+        for alt_form in yield_alt_forms(mon)
+    )
+    # Must remap cached pokemon data if new types found
+    stale_dexns = []
     if found_new_types:
         print('Wow! Found new types!')
+        mon_list, stale_dexns = remap_mon_list(
+            mon_list, extra_form_name_dict,
+            to_type_combo_map(old_type_combos, type_combos)
+        )
+        clear_journal()
+
+    # Resume from Pokémon committed by an interrupted run
+    for dexn, mon, extra_forms in read_journal():
+        if dexn != len(mon_list) + 1:
+            continue
+        mon_list.append(mon)
+        for form_id, name in extra_forms:
+            extra_form_name_dict[form_id] = name
+    print(
+        f'Resuming after Pokémon #{len(mon_list)}',
+        flush=True, file=sys.stderr
+    )
 
     print('Updating Games...', flush=True, file=sys.stderr)
     game_list = Service.update_games(
         api_url, list(read_game_list())
     )
     print('Updating Pokémon...', flush=True, file=sys.stderr)
-    # Load Pokémon
-    while True:
-        try:
-            dexn = len(mon_list) + 1
-            name, mon, extra_forms = (
-                describe_mon(dexn, type_combos, api_url)
-            )
+    with to_api_cache().revalidating():
+        stale_dexns += to_retyped_dexns(
+            api_url, mon_list,
+            to_added_types(old_type_combos, type_combos)
+        )
+        refetch_stale_mons(
+            api_url, stale_dexns, type_combos,
+            mon_list, extra_form_name_dict
+        )
+    # Load Pokémon, many species at a time
+    with open_journal() as commit_mon:
+        for dexn, name, mon, extra_forms in describe_mons(
+            count(len(mon_list) + 1), type_combos, api_url
+        ):
+            commit_mon(dexn, mon, extra_forms)
             mon_list.append(mon)
             print(f'Loaded Pokémon #{dexn} {name}')
             for form_id, name in extra_forms:
@@ -148,8 +263,6 @@ def load_updates(api_url):
                 ', '.join([f[1] for f in extra_forms[:2]]),
                 '...' if len(extra_forms) > 2 else ''
             )
-        except ValueError:
-            break
 
     return {
         'extra_form_name_dict': extra_form_name_dict,
@@ -161,9 +274,16 @@ def load_updates(api_url):
 if __name__ == "__main__":
 
     API_URL = 'https://pokeapi.co/api/v2/'
+    ARGS = parser.parse_args()
+    api_cache = to_api_cache()
+    api_cache.offline = ARGS.offline
+    if ARGS.cache_ttl is not None:
+        api_cache.ttl = ARGS.cache_ttl
     updates = load_updates(API_URL)
-    start_servers(
-        parser.parse_args(),
+    # Running servers reload on SIGHUP
+    serve = save_updates if ARGS.update_only else start_servers
+    serve(
+        ARGS,
         api_url = API_URL,
         extra_form_name_dict = updates['extra_form_name_dict'],
         type_combos = updates['type_combos'],
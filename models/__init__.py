@@ -5,11 +5,20 @@ from .messages import MessageState
 
 from .mon import unpackage_mon_list
 from .mon import package_form_lists
+from .mon import remap_form_index_list
 from .mon import unpackage_mon
 from .mon import to_form
 from .mon import to_mon
 from .mon import Form
+from .mon import FormInfo
 from .mon import Mon
 
 from .dex import to_dex_map
 from .dex import DexMap
+
+from .batch import BatchMatches
+from .batch import BatchForms
+from .batch import MatchQuery
+from .batch import FormsQuery
+from .batch import BatchTests
+from .batch import TestQuery
@@ -0,0 +1,27 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+# Enough for every cell of a few boards
+BATCH_LIMIT = 100
+
+class MatchQuery(BaseModel):
+    guess: str = ''
+    max_gen: Optional[int] = None
+    fuzzy: bool = False
+
+class FormsQuery(BaseModel):
+    dexn: Optional[int] = None
+    max_gen: Optional[int] = None
+
+class TestQuery(BaseModel):
+    form_id: Optional[int] = None
+    conditions: str = ''
+
+class BatchMatches(BaseModel):
+    queries: List[MatchQuery] = Field(max_items=BATCH_LIMIT)
+
+class BatchForms(BaseModel):
+    queries: List[FormsQuery] = Field(max_items=BATCH_LIMIT)
+
+class BatchTests(BaseModel):
+    queries: List[TestQuery] = Field(max_items=BATCH_LIMIT)
@@ -1,4 +1,3 @@
-import functools
 from collections import defaultdict
 from typing import Dict, List
 from pydantic import BaseModel
@@ -32,7 +31,7 @@ class DexMap(BaseModel):
 def to_dexes(game:list[int, int, list[int], list[str]]):
     game_group, generation, dex_ids, regions = game
     return [
-        Dex(
+        Dex.construct(
             id=id, regions=regions,
             generation=generation,
             game_group=game_group
@@ -40,35 +39,31 @@ def to_dexes(game:list[int, int, list[int], list[str]]):
         for id in dex_ids
     ]
 
-
 def to_dex_map(
     games: list[list[int, int, list[int], list[str]]]
 ) -> DexMap:
-    def from_games(
-        dicts: dict[str, list[Dex]],
-        game: list[int, int, list[int], list[str]]
-    ):
-        def update(k1,k2):
-            ids = [ v.id for v in dicts[k1][k2] ]
-            dicts[k1][k2] = (
-                dicts[k1][k2] + [
-                    dex for dex in to_dexes(game)
-                    if dex.id not in ids 
-                ]
-            )
+    # Dexes by id, in order first seen, per key of each view
+    dicts = {
+        "regions": defaultdict(dict),
+        "game_groups": defaultdict(dict),
+        "generations": defaultdict(dict)
+    }
+    for game in games:
         game_group, generation, _, regions = game
-        update('generations', generation)
-        update('game_groups', game_group)
-        for region in regions:
-            update('regions', region)
-        return dicts
-    dicts = functools.reduce(from_games, games, {
-        "regions": defaultdict(list),
-        "game_groups": defaultdict(list),
-        "generations": defaultdict(list)
-    })
+        dexes = to_dexes(game)
+        keys = [
+            ('generations', generation),
+            ('game_groups', game_group)
+        ] + [
+            ('regions', region) for region in regions
+        ]
+        for k1, k2 in keys:
+            found = dicts[k1][k2]
+            for dex in dexes:
+                found.setdefault(dex.id, dex)
+    # Views of saved game lists, trusted without validation
     by_game_group = {
-        game_group: GameGroupData(
+        game_group: GameGroupData.construct(
             dexes=dexes,
             regions=list(set(
                 region for dex in dexes
@@ -77,11 +72,13 @@ def to_dex_map(
             generations=list(set(
                 dex.generation for dex in dexes
             ))
-        ) for game_group, dexes
-        in dicts['game_groups'].items()
+        ) for game_group, dexes in (
+            (k, list(d.values()))
+            for k, d in dicts['game_groups'].items()
+        )
     }
     by_generation = {
-        generation: GenerationData(
+        generation: GenerationData.construct(
             dexes=dexes,
             regions=list(set(
                 region for dex in dexes
@@ -90,11 +87,13 @@ def to_dex_map(
             game_groups=list(set(
                 dex.game_group for dex in dexes
             ))
-        ) for generation, dexes
-        in dicts['generations'].items()
+        ) for generation, dexes in (
+            (k, list(d.values()))
+            for k, d in dicts['generations'].items()
+        )
     }
     by_region = {
-        region: RegionData(
+        region: RegionData.construct(
             dexes=dexes,
             generations=list(set(
                 dex.generation for dex in dexes
@@ -102,10 +101,12 @@ def to_dex_map(
             game_groups=list(set(
                 dex.game_group for dex in dexes
             ))
-        ) for region, dexes
-        in dicts['regions'].items()
+        ) for region, dexes in (
+            (k, list(d.values()))
+            for k, d in dicts['regions'].items()
+        )
     }
-    return DexMap(
+    return DexMap.construct(
         by_region=by_region,
         by_generation=by_generation,
         by_game_group=by_game_group
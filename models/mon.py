@@ -1,19 +1,62 @@
-from typing import List
 from itertools import accumulate
-from pydantic import BaseModel
 
-class Form(BaseModel):
+class Frozen:
+    # Immutable, unvalidated, with no per-instance dict
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for key in self.__slots__:
+            object.__setattr__(self, key, kwargs[key])
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __iter__(self):
+        # Field pairs, for dict(obj) and JSON encoding
+        for key in self.__slots__:
+            yield key, getattr(self, key)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        fields = ', '.join(f'{k}={v!r}' for k, v in self)
+        return f'{type(self).__name__}({fields})'
+
+class Form(Frozen):
+    __slots__ = (
+        'game_group', 'type_combo', 'form_id', 'mon_id', 'name'
+    )
+    # Fields as set by Frozen, for linters
     game_group: int
     type_combo: int
     form_id: int
     mon_id: int
     name: str
 
-class Mon(BaseModel):
-    forms: List[Form]
+class Mon(Frozen):
+    __slots__ = ('forms', 'name', 'id')
+    forms: tuple
     name: str
     id: int
 
+    def __init__(self, **kwargs):
+        super().__init__(**{
+            **kwargs, 'forms': tuple(kwargs['forms'])
+        })
+
+class FormInfo(Frozen):
+    # Generations and region of a form, by its game group
+    __slots__ = (
+        'first_gen', 'some_gens', 'all_gens', 'first_region'
+    )
+    first_gen: int | None
+    some_gens: frozenset
+    all_gens: frozenset
+    first_region: str | None
+
 def to_form(name, form_id, type_combo, game_group, mon_id):
     return Form(
         name=name,
@@ -65,6 +108,24 @@ FORM_CHUNK = len(
     ))
 )
 
+def remap_form_index_list(
+    form_count_list, form_index_list, combo_map
+):
+    # Rewrite type combos in place, listing dex numbers
+    # of any Pokémon with forms whose types were removed
+    unmapped = []
+    ends = accumulate(m[1] for m in form_count_list)
+    start = 0
+    for dexn, end in enumerate(ends, 1):
+        for i in range(start*FORM_CHUNK, end*FORM_CHUNK, FORM_CHUNK):
+            combo = combo_map[form_index_list[i+1]]
+            if combo is None:
+                unmapped.append(dexn)
+                continue
+            form_index_list[i+1] = combo
+        start = end
+    return sorted(set(unmapped))
+
 def unpackage_mon_list(
     form_count_list, form_index_list,
     extra_form_name_dict
@@ -0,0 +1,104 @@
+import sys
+import random
+import argparse
+import tempfile
+from timeit import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from util.base15 import (
+    read_base15, write_base15, to_base15, from_base15
+)
+
+# Byte-at-a-time codec replaced by util.base15
+
+def legacy_read_base15(file):
+    def read_nibbles():
+        with open(file, "rb") as f:
+            while (byte := f.read(1)):
+                val = int.from_bytes(byte, 'big')
+                yield from (val >> 4, val & 15)
+    digits = []
+    comma = int('1111', 2)
+    for nibble in read_nibbles():
+        if nibble == comma:
+            yield from_base15(digits)
+            digits = []
+            continue
+        digits.append(nibble)
+    yield from_base15(digits)
+
+def legacy_write_base15(file, array):
+    comma = int('1111', 2)
+    digits = [
+        digit for value in array
+        for digit in to_base15(value, comma)
+    ]
+    base15_bytes = bytes([
+        (digit1 << 4) + digit2 for digit1,digit2
+        in zip(digits[:-1:2], digits[1::2])
+    ])
+    with open(file, 'wb') as f:
+        f.write(base15_bytes)
+
+def to_form_index_list(n_species, seed=0):
+    # Form id, type combo, game group, and mon id per form
+    rng = random.Random(seed)
+    extra_id = 10000
+    for dexn in range(1, n_species + 1):
+        game_group = 1 + (dexn - 1) * 27 // n_species
+        yield from [dexn, rng.randrange(171), game_group, dexn]
+        for _ in range(rng.choice([0, 0, 0, 1, 2])):
+            extra_id += 1
+            yield from [
+                extra_id, rng.randrange(171),
+                rng.randrange(game_group, 28), extra_id
+            ]
+
+def check_compatible(folder, array):
+    new_file = folder / 'new.base15'
+    old_file = folder / 'old.base15'
+    write_base15(new_file, array)
+    legacy_write_base15(old_file, array)
+    assert new_file.read_bytes() == old_file.read_bytes()
+    assert list(read_base15(old_file)) == list(
+        legacy_read_base15(old_file)
+    )
+
+def to_speedup(label, new, old, number):
+    new_s = timeit(new, number=number) / number
+    old_s = timeit(old, number=number) / number
+    print(
+        f'{label}: {old_s*1e3:.2f}ms -> {new_s*1e3:.2f}ms',
+        f'({old_s/new_s:.1f}x)'
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Compare base15 codec with byte-at-a-time codec'
+    )
+    parser.add_argument('--species', type=int, default=1025)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+    array = list(to_form_index_list(args.species))
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        for n in range(0, 9):
+            check_compatible(folder, array[:n])
+        check_compatible(folder, array)
+        file = folder / 'index.base15'
+        write_base15(file, array)
+        print(
+            f'{len(array)//4} forms, {len(array)} values,',
+            f'{file.stat().st_size} bytes'
+        )
+        to_speedup(
+            'Read', lambda: list(read_base15(file)),
+            lambda: list(legacy_read_base15(file)), args.number
+        )
+        to_speedup(
+            'Write', lambda: write_base15(file, array),
+            lambda: legacy_write_base15(file, array), args.number
+        )
@@ -0,0 +1,125 @@
+import sys
+import random
+import argparse
+import functools
+from timeit import timeit
+from pathlib import Path
+from collections import defaultdict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from models import to_dex_map
+from models.dex import (
+    Dex, DexMap, GameGroupData, GenerationData, RegionData
+)
+
+REGIONS = [
+    'kanto', 'johto', 'hoenn', 'sinnoh', 'unova',
+    'kalos', 'alola', 'galar', 'paldea'
+]
+
+# Reduce with list concatenation, replaced by models.dex
+
+def legacy_to_dexes(game):
+    game_group, generation, dex_ids, regions = game
+    return [
+        Dex(
+            id=id, regions=regions,
+            generation=generation,
+            game_group=game_group
+        )
+        for id in dex_ids
+    ]
+
+def legacy_to_dex_map(games):
+    def from_games(dicts, game):
+        def update(k1,k2):
+            ids = [ v.id for v in dicts[k1][k2] ]
+            dicts[k1][k2] = (
+                dicts[k1][k2] + [
+                    dex for dex in legacy_to_dexes(game)
+                    if dex.id not in ids 
+                ]
+            )
+        game_group, generation, _, regions = game
+        update('generations', generation)
+        update('game_groups', game_group)
+        for region in regions:
+            update('regions', region)
+        return dicts
+    dicts = functools.reduce(from_games, games, {
+        "regions": defaultdict(list),
+        "game_groups": defaultdict(list),
+        "generations": defaultdict(list)
+    })
+    def to_view(model, dexes, **keys):
+        return model(dexes=dexes, **{
+            k: list(set(v for dex in dexes for v in fn(dex)))
+            for k, fn in keys.items()
+        })
+    regions = lambda dex: dex.regions
+    generations = lambda dex: [dex.generation]
+    game_groups = lambda dex: [dex.game_group]
+    return DexMap(
+        by_region={
+            k: to_view(
+                RegionData, v,
+                generations=generations, game_groups=game_groups
+            ) for k, v in dicts['regions'].items()
+        },
+        by_generation={
+            k: to_view(
+                GenerationData, v,
+                regions=regions, game_groups=game_groups
+            ) for k, v in dicts['generations'].items()
+        },
+        by_game_group={
+            k: to_view(
+                GameGroupData, v,
+                regions=regions, generations=generations
+            ) for k, v in dicts['game_groups'].items()
+        }
+    )
+
+def to_games(n_games, seed=0):
+    # Version groups sharing regional and national dexes
+    rng = random.Random(seed)
+    for game_group in range(1, n_games + 1):
+        gen = 1 + (game_group - 1) * len(REGIONS) // n_games
+        dex_ids = [1] + rng.sample(range(2, 2 + n_games), 3)
+        yield [game_group, gen, dex_ids, [REGIONS[gen - 1]]]
+
+def check_equal(games):
+    new = to_dex_map(games)
+    old = legacy_to_dex_map(games)
+    for key in ['by_region', 'by_generation', 'by_game_group']:
+        new_view = getattr(new, key)
+        old_view = getattr(old, key)
+        assert list(new_view) == list(old_view)
+        for k, data in new_view.items():
+            assert [dict(d) for d in data.dexes] == [
+                dict(d) for d in old_view[k].dexes
+            ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Time to_dex_map as version groups grow'
+    )
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+    for n_games in [25, 50, 100, 200, 400, 800]:
+        games = list(to_games(n_games))
+        check_equal(games)
+        new_s = timeit(
+            lambda: to_dex_map(games), number=args.number
+        ) / args.number
+        old_s = timeit(
+            lambda: legacy_to_dex_map(games), number=args.number
+        ) / args.number
+        print(
+            f'{n_games} version groups:',
+            f'{old_s*1e3:.2f}ms -> {new_s*1e3:.2f}ms',
+            f'({old_s/new_s:.1f}x),',
+            f'{new_s/n_games*1e6:.1f}us per version group'
+        )
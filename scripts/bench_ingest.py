@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import resource
+from pathlib import Path
+from contextlib import redirect_stdout
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_pokeapi import ROOT_PATH, STATS_PATH
+from main import load_updates
+from util import to_api_client
+
+def to_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_fake_api(args, port):
+    # Separate process, so the server has its own GIL
+    command = [
+        sys.executable, str(Path(__file__).parent / 'fake_pokeapi.py'),
+        '--port', str(port), '--species', str(args.species),
+        '--latency', str(args.latency),
+        '--error-rate', str(args.error_rate)
+    ] + (['--fixtures', str(args.fixtures)] if args.fixtures else [])
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    # Wait for the server to announce itself
+    process.stdout.readline()
+    return process
+
+def read_stats(port):
+    url = f'http://127.0.0.1:{port}{STATS_PATH}'
+    return requests.get(url, timeout=30).json()
+
+def read_status_kib(key):
+    with open('/proc/self/status', 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(f'{key}:'):
+                return int(line.split()[1])
+    return 0
+
+def start_peak_rss():
+    # Linux resets the peak to the current resident set size
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='utf-8') as f:
+            f.write('5')
+        return read_status_kib('VmRSS')
+    except OSError:
+        return None
+
+def to_peak_rss(start_rss):
+    if start_rss is None:
+        # Peak of the whole process, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Growth of the peak during this run only
+    return read_status_kib('VmHWM') - start_rss
+
+def run_ingest(port):
+    start_requests = read_stats(port)['requests']
+    start_rss = start_peak_rss()
+    start = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as f:
+        with redirect_stdout(f):
+            updates = load_updates(
+                f'http://127.0.0.1:{port}{ROOT_PATH}'
+            )
+    seconds = time.perf_counter() - start
+    peak = to_peak_rss(start_rss)
+    n_requests = read_stats(port)['requests'] - start_requests
+    return {
+        'seconds': seconds,
+        'requests': n_requests,
+        'rps': n_requests / seconds,
+        'peak_mb': peak / 2**10,
+        'mons': len(updates['mon_list']),
+        'forms': sum(len(m.forms) for m in updates['mon_list'])
+    }
+
+def print_result(label, result):
+    print(
+        f'{label}: {result["mons"]} Pokémon',
+        f'({result["forms"]} forms)',
+        f'in {result["seconds"]:.2f}s,',
+        f'{result["requests"]} requests',
+        f'({result["rps"]:.0f}/s),',
+        f'peak +{result["peak_mb"]:.1f} MiB'
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark load_updates against a fake PokéAPI'
+    )
+    parser.add_argument('--fixtures', type=Path)
+    parser.add_argument('--species', type=int, default=1025)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--host-limit', type=int)
+    parser.add_argument(
+        '--warm', action='store_true',
+        help='Also time a second ingest from the response cache'
+    )
+    args = parser.parse_args()
+    if args.host_limit:
+        to_api_client().host_limit = args.host_limit
+    port = to_free_port()
+    fake_api = start_fake_api(args, port)
+    # Ingest into an empty data folder
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            os.mkdir('data')
+            print_result('Cold', run_ingest(port))
+            if args.warm:
+                os.remove(os.path.join('data', 'mon-journal.env.jsonl'))
+                print_result('Warm', run_ingest(port))
+            os.chdir(ROOT)
+    finally:
+        fake_api.terminate()
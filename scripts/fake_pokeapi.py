@@ -0,0 +1,247 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+POKEAPI_URL = 'https://pokeapi.co/api/v2/'
+ROOT_PATH = '/api/v2/'
+STATS_PATH = '/__stats__'
+TYPES = [
+    'normal', 'fighting', 'flying', 'poison', 'ground', 'rock',
+    'bug', 'ghost', 'steel', 'fire', 'water', 'grass',
+    'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy'
+]
+REGIONS = [
+    'kanto', 'johto', 'hoenn', 'sinnoh', 'unova',
+    'kalos', 'alola', 'galar', 'paldea'
+]
+
+def to_key(path):
+    return '/'.join(p for p in path.split('/') if p)
+
+def read_fixtures(fixture_dir):
+    # One "index.json" per PokéAPI path
+    return {
+        to_key(str(f.parent.relative_to(fixture_dir))): (
+            f.read_text(encoding='utf-8')
+        )
+        for f in Path(fixture_dir).rglob('index.json')
+    }
+
+def write_fixtures(fixture_dir, fixtures):
+    for key, text in fixtures.items():
+        path = Path(fixture_dir) / key / 'index.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+def record_fixtures(cache_root):
+    # Fixtures from responses in the PokéAPI cache
+    for f in (Path(cache_root) / 'index').rglob('*.json'):
+        entry = json.loads(f.read_text(encoding='utf-8'))
+        if entry['sha'] is None:
+            continue
+        url = urlparse(entry['url'])
+        # Later pages are served by paginating the first
+        if int(parse_qs(url.query).get('offset', ['0'])[0]):
+            continue
+        sha = entry['sha']
+        body = Path(cache_root) / 'objects' / sha[:2] / f'{sha}.json'
+        path = url.path.split(ROOT_PATH, 1)[-1]
+        yield to_key(path), body.read_text(encoding='utf-8')
+
+def to_synthetic_fixtures(n_species, n_games=27):
+    def link(path):
+        return { 'url': f'{POKEAPI_URL}{path}/' }
+    fixtures = {}
+    def add(key, body):
+        fixtures[key] = json.dumps(body)
+    add('type', { 'count': len(TYPES), 'next': None, 'results': [
+        { 'name': t, **link(f'type/{i}') }
+        for i, t in enumerate(TYPES, 1)
+    ]})
+    games = range(1, n_games + 1)
+    add('version-group', { 'count': n_games, 'next': None, 'results': [
+        { 'name': f'game-{g}', **link(f'version-group/{g}') }
+        for g in games
+    ]})
+    to_gen = lambda g: 1 + (g - 1) * len(REGIONS) // n_games
+    for g in games:
+        add(f'version-group/{g}', {
+            'name': f'game-{g}',
+            'generation': link(f'generation/{to_gen(g)}'),
+            'pokedexes': [ link(f'pokedex/{g}') ],
+            'regions': [ { 'name': REGIONS[to_gen(g) - 1] } ]
+        })
+    rng = random.Random(n_species)
+    type_mons = { t: [] for t in TYPES }
+    extra_id = 10000
+    for dexn in range(1, n_species + 1):
+        name = f'mon-{dexn}'
+        game = 1 + (dexn - 1) * n_games // n_species
+        varieties = [ (dexn, name) ]
+        # Regional and gimmick varieties for some species
+        for suffix in ['alola', 'mega'][:rng.choice([0, 0, 0, 1, 2])]:
+            extra_id += 1
+            varieties.append((extra_id, f'{name}-{suffix}'))
+        add(f'pokemon-species/{dexn}', {
+            'name': name, 'varieties': [
+                { 'pokemon': link(f'pokemon/{v}') }
+                for v, _ in varieties
+            ]
+        })
+        for i, (variety, variety_name) in enumerate(varieties):
+            add(f'pokemon/{variety}', {
+                'forms': [ link(f'pokemon-form/{variety}') ]
+            })
+            types = rng.sample(TYPES, rng.choice([1, 2]))
+            for t in types:
+                type_mons[t].append(variety)
+            add(f'pokemon-form/{variety}', {
+                'name': variety_name,
+                'types': [ { 'type': { 'name': t } } for t in types ],
+                'version_group': link(
+                    f'version-group/{min(n_games, game + 3*i)}'
+                )
+            })
+    # Pokémon varieties of each type
+    for t, varieties in type_mons.items():
+        add(f'type/{t}', { 'name': t, 'pokemon': [
+            { 'pokemon': link(f'pokemon/{v}') } for v in varieties
+        ]})
+    return fixtures
+
+def paginate(body, url, query):
+    limit = int(query.get('limit', ['20'])[0])
+    offset = int(query.get('offset', ['0'])[0])
+    results = body['results']
+    end = offset + limit
+    return {
+        **body,
+        'count': len(results),
+        'next': (
+            f'{url}?limit={limit}&offset={end}'
+            if end < len(results) else None
+        ),
+        'results': results[offset:end]
+    }
+
+class FakeServer(ThreadingHTTPServer):
+    request_queue_size = 256
+    daemon_threads = True
+
+class FakePokeApi:
+    def __init__(
+        self, fixtures, port=0, latency=0.0, error_rate=0.0
+    ):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock_requests = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.server = FakeServer(
+            ('127.0.0.1', port), self.to_handler()
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}{ROOT_PATH}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        return 200, json.dumps({
+            'requests': self.requests, 'errors': self.errors
+        }).encode()
+
+    def respond(self, path, query):
+        if path == STATS_PATH:
+            return self.stats()
+        with self.lock_requests:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            with self.lock_requests:
+                self.errors += 1
+            return 503, b''
+        key = to_key(path.split(ROOT_PATH, 1)[-1])
+        text = self.fixtures.get(key)
+        if text is None:
+            return 404, b'Not Found'
+        body = json.loads(text.replace(POKEAPI_URL, self.url))
+        if isinstance(body.get('results'), list):
+            body = paginate(body, self.url + key + '/', query)
+        return 200, json.dumps(body).encode()
+
+    def to_handler(self):
+        api = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            def log_message(self, *_):
+                pass
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, data = api.respond(
+                    url.path, parse_qs(url.query)
+                )
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        return Handler
+
+def to_fixtures(args):
+    if args.fixtures:
+        return read_fixtures(args.fixtures)
+    return to_synthetic_fixtures(args.species)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Serve recorded PokéAPI fixtures locally'
+    )
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', type=Path)
+    parser.add_argument('--species', type=int, default=1025)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument(
+        '--record', type=Path, metavar='CACHE_ROOT',
+        help='Write fixtures from a PokéAPI response cache'
+    )
+    args = parser.parse_args()
+    if args.record:
+        if not args.fixtures:
+            print('--record needs a --fixtures folder')
+            sys.exit(1)
+        write_fixtures(args.fixtures, dict(
+            record_fixtures(args.record)
+        ))
+        print(f'Recorded fixtures to {args.fixtures}')
+        sys.exit(0)
+    fake_api = FakePokeApi(
+        to_fixtures(args), args.port,
+        args.latency, args.error_rate
+    )
+    print(f'Serving fake PokéAPI at {fake_api.url}', flush=True)
+    try:
+        fake_api.server.serve_forever()
+    except KeyboardInterrupt:
+        fake_api.stop()
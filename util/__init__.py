@@ -1,19 +1,43 @@
 from functools import lru_cache
 
 from .config import to_config
+from .config import to_config_store
+from .config import build_config
 from .config import set_config
 from .config import describe_mon 
+from .config import MonNotFound
 from .config import describe_type_combos
+from .config import to_type_combo_map
+from .config import to_added_types
+from .config import describe_type_mon_ids
 
 from .config import get_api
 from .config import id_from_url
-from .config import to_generations
-from .config import to_form_generations
-from .config import to_form_region_no_gimmicks
 from .config import read_extra_form_name_dict
 from .config import read_form_count_list
 from .config import read_form_index_list
 from .config import read_type_combos
 from .config import read_game_list
+from .config import read_mon_list
+from .config import read_data_bundle
+from .config import yield_alt_forms
+
+from .ingest import describe_mons
+from .ingest import WORKERS
+
+from .cache import to_api_cache
+
+from .fetch import to_api_client
+from .fetch import ApiUnavailable
+
+from .journal import read_journal
+from .journal import open_journal
+from .journal import clear_journal
+
+from .bundle import BundleError
+
+from .warmup import to_readiness
+
+from .static import to_static_cache
 
 from .multiplayer import to_multiplayer
@@ -1,3 +1,10 @@
+import threading
+from operator import itemgetter
+
+# Digits 0 to 14 as hex, with "f" as the comma
+HEX_DIGITS = '0123456789abcde'
+COMMA = 'f'
+
 def to_base15(n,comma=None):
     while n > 0:
         yield n % 15 
@@ -13,31 +20,51 @@ def from_base15(base15):
             place *= 15
     return sum(placed())
 
+def to_base15_hex(n):
+    # Least significant digit first, as stored
+    return ''.join(HEX_DIGITS[d] for d in to_base15(n)) + COMMA
+
+class FromBase15Hex(dict):
+    def __missing__(self, nibbles):
+        n = int(nibbles[::-1], 15) if nibbles else 0
+        self[nibbles] = n
+        return n
+
+# Hex nibbles of every value up to the largest written
+TO_HEX = []
+TO_HEX_LIMIT = 2**16
+LOCK_TO_HEX = threading.Lock()
+# Indices repeat, so each value is converted once
+FROM_HEX = FromBase15Hex()
+
 def read_base15(file):
-    def read_nibbles():
-        with open(file, "rb") as f:
-            while (byte := f.read(1)):
-                val = int.from_bytes(byte, 'big')
-                yield from (val >> 4, val & 15)
-    digits = []
-    comma = int('1111', 2)
-    for nibble in read_nibbles():
-        if nibble == comma:
-            yield from_base15(digits)
-            digits = []
-            continue
-        digits.append(nibble)
-    yield from_base15(digits)
+    # Each nibble is one hex character
+    with open(file, "rb") as f:
+        nibbles = f.read().hex()
+    yield from map(FROM_HEX.__getitem__, nibbles.split(COMMA))
+
+def grow_to_hex(size):
+    with LOCK_TO_HEX:
+        TO_HEX.extend(map(to_base15_hex, range(len(TO_HEX), size)))
+
+def to_hexes(array):
+    # Non-negative values, all looked up in one call
+    if len(array) < 2:
+        return [TO_HEX[n] for n in array]
+    return itemgetter(*array)(TO_HEX)
 
 def write_base15(file, array):
-    comma = int('1111', 2)
-    digits = [
-        digit for value in array
-        for digit in to_base15(value, comma)
-    ]
-    base15_bytes = bytes([
-        (digit1 << 4) + digit2 for digit1,digit2
-        in zip(digits[:-1:2], digits[1::2])
-    ])
+    try:
+        hexes = to_hexes(array)
+    except IndexError:
+        size = max(array) + 1
+        if size <= TO_HEX_LIMIT:
+            grow_to_hex(size)
+            hexes = to_hexes(array)
+        else:
+            hexes = map(to_base15_hex, array)
+    nibbles = ''.join(hexes)
+    # Odd final nibble is dropped, as it always was
+    end = len(nibbles) - len(nibbles) % 2
     with open(file, 'wb') as f:
-        f.write(base15_bytes)
+        f.write(bytes.fromhex(nibbles[:end]))
@@ -0,0 +1,86 @@
+import os
+import json
+import struct
+import hashlib
+import tempfile
+
+MAGIC = b'TKTBNDL\0'
+SCHEMA = 1
+# Magic and manifest length, padded to 16 bytes
+PREFIX = struct.Struct('<8sI4x')
+ALIGN = 8
+
+class BundleError(ValueError):
+    pass
+
+def to_padding(n):
+    return b'\0' * (-n % ALIGN)
+
+def package_bundle(sections):
+    layout = {}
+    parts = []
+    offset = 0
+    # Sections are aligned for int32 column views
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        parts += [data, to_padding(len(data))]
+        offset += len(data) + len(parts[-1])
+    payload = b''.join(parts)
+    manifest = json.dumps({
+        'schema': SCHEMA,
+        'sha256': hashlib.sha256(payload).hexdigest(),
+        'sections': layout
+    }).encode('utf-8')
+    manifest += b' ' * (-len(manifest) % ALIGN)
+    return b''.join([
+        PREFIX.pack(MAGIC, len(manifest)), manifest, payload
+    ])
+
+def write_bundle(file, sections):
+    folder = os.path.dirname(file) or '.'
+    with tempfile.NamedTemporaryFile(
+        dir=folder, delete=False
+    ) as f:
+        f.write(package_bundle(sections))
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(f.name, 0o644)
+    # Readers see either the old or the new bundle
+    os.replace(f.name, file)
+
+class Bundle:
+    def __init__(self, buffer):
+        buffer = memoryview(buffer)
+        if len(buffer) < PREFIX.size:
+            raise BundleError('Truncated bundle')
+        magic, n_manifest = PREFIX.unpack_from(buffer)
+        if magic != MAGIC:
+            raise BundleError(f'Not a bundle: {bytes(magic)}')
+        end = PREFIX.size + n_manifest
+        try:
+            manifest = json.loads(str(buffer[PREFIX.size:end], 'utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise BundleError('Torn bundle manifest') from e
+        if manifest.get('schema') != SCHEMA:
+            raise BundleError(
+                f'Stale bundle schema {manifest.get("schema")}'
+            )
+        payload = buffer[end:]
+        if hashlib.sha256(payload).hexdigest() != manifest['sha256']:
+            raise BundleError('Torn bundle, hash mismatch')
+        self.version = manifest['sha256']
+        self.sections = {
+            name: payload[offset:offset + length]
+            for name, (offset, length)
+            in manifest['sections'].items()
+        }
+
+    def to_json(self, name):
+        return json.loads(str(self.sections[name], 'utf-8'))
+
+def read_bundle(file):
+    with open(file, 'rb') as f:
+        data = f.read()
+    if not data:
+        raise BundleError('Empty bundle')
+    return Bundle(data)
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from functools import lru_cache
+
+CACHE_ROOT = Path('data') / 'api-cache'
+# Revalidate responses older than one week
+CACHE_TTL = 7 * 24 * 60 * 60
+
+def to_sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+def to_path(root, sha):
+    return root / sha[:2] / f'{sha}.json'
+
+def write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, delete=False
+    ) as f:
+        f.write(data)
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, path)
+
+class ApiCache:
+    def __init__(self, root=CACHE_ROOT, ttl=CACHE_TTL, offline=False):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.offline = offline
+
+    @property
+    def index_root(self):
+        return self.root / 'index'
+
+    @property
+    def object_root(self):
+        return self.root / 'objects'
+
+    def lookup(self, url):
+        path = to_path(self.index_root, to_sha(url.encode()))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, entry):
+        if self.ttl is None:
+            return True
+        # Missing resources, like the next species, may appear
+        if entry['sha'] is None:
+            return False
+        return time.time() - entry['fetched'] < self.ttl
+
+    @contextmanager
+    def revalidating(self):
+        # Every cached response is revalidated meanwhile
+        ttl = self.ttl
+        self.ttl = 0
+        try:
+            yield self
+        finally:
+            self.ttl = ttl
+
+    def load(self, entry):
+        # Missing resources are cached as empty entries
+        if entry['sha'] is None:
+            return None
+        path = to_path(self.object_root, entry['sha'])
+        with open(path, 'rb') as f:
+            return json.loads(f.read())
+
+    def validators(self, entry):
+        if not entry or entry['sha'] is None:
+            return {}
+        return {
+            k: entry[v] for k, v in [
+                ('if-none-match', 'etag'),
+                ('if-modified-since', 'last_modified')
+            ] if entry.get(v)
+        }
+
+    def commit(self, entry):
+        path = to_path(self.index_root, to_sha(entry['url'].encode()))
+        entry = { **entry, 'fetched': time.time() }
+        write_atomic(path, json.dumps(entry).encode())
+        return entry
+
+    def store(self, url, response):
+        sha = None
+        if response.status_code == 200:
+            sha = to_sha(response.content)
+            path = to_path(self.object_root, sha)
+            if not path.exists():
+                write_atomic(path, response.content)
+        self.commit({
+            'url': url, 'sha': sha,
+            'status': response.status_code,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified')
+        })
+        return None if sha is None else response.json()
+
+@lru_cache()
+def to_api_cache():
+    return ApiCache()
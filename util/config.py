@@ -1,18 +1,23 @@
 import csv
 import json
 import logging
+import threading
+from bisect import bisect_right
 from pathlib import Path
 from typing import Dict, List, Union
 from urllib.parse import urlparse
 from functools import lru_cache
 from pydantic import BaseSettings, BaseModel
-import requests
 from models import (
-    unpackage_mon_list, package_form_lists,
+    unpackage_mon_list,
     to_dex_map, to_form, to_mon,
-    Mon, Form, DexMap
+    Mon, Form, FormInfo, DexMap
 )
-from .base15 import write_base15, read_base15
+from .base15 import read_base15
+from .snapshot import package_snapshot, Snapshot
+from .bundle import write_bundle, read_bundle
+from .cache import to_api_cache
+from .fetch import to_api_client, ApiUnavailable
 
 CONFIG = {
     k: Path('data') / v for k,v in
@@ -22,84 +27,98 @@ CONFIG = {
         'TYPES': 'type-combos.config.json',
         'FORM_INDEX': 'form-index-list.env.base15',
         'FORM_COUNT': 'form-count-list.env.csv',
-        'FORM_NAMES': 'form-name-list.env.csv'
+        'FORM_NAMES': 'form-name-list.env.csv',
+        'JOURNAL': 'mon-journal.env.jsonl',
+        'BUNDLE': 'dex.env.bundle'
     }).items()
 }
 MONO = 'monotype'
+GIMMICKS = ['mega', 'primal', 'origin', 'gmax']
 
-def to_form_data(by_game_group, form, quantifier, key):
-    found_game = False
-    for group, data in by_game_group.items():
-        if form.game_group == group:
-            found_game = True
-        if not found_game: continue
-        yield from getattr(data, key)
-        # Strict only allows first game
-        if quantifier != 'ALL': break
-        # Subsequent games
-
-def to_form_generations(*args):
-    return to_form_data(*(args+('generations',)))
-
-def to_form_regions(*args):
-    return to_form_data(*(args+('regions',)))
-
-def to_form_region_no_gimmicks(
-    mon, by_game_group, form, quantifier
-):
-    gimmicks = ['mega', 'primal', 'origin', 'gmax']
-    args = [by_game_group, form, quantifier]
-    has_gimick = (
-        any(
-            True for part in form.name.split('-')
-            if part in gimmicks
-        )
+def has_gimmick(form):
+    return any(
+        True for part in form.name.split('-')
+        if part in GIMMICKS
     )
-    # Gimick is from their original region
-    if has_gimick:
-        args[1] = mon.forms[0]
-    regions = list(to_form_regions(*args))
-    # TODO -- games with two regions
-    # -- disambiguate somehow
-    # -- only occurs with kanto-johto
-    return regions[-1]
-
-def to_generations(by_game_group, mon, quantifier):
-    for form in mon.forms:
-        yield from to_form_generations(
-            by_game_group, form, quantifier
+
+def to_game_group_table(by_game_group):
+    table = dict()
+    all_gens = frozenset()
+    # Later games are seen first, to collect all their generations
+    for group, data in reversed(by_game_group.items()):
+        some_gens = frozenset(data.generations)
+        all_gens = some_gens | all_gens
+        # TODO -- games with two regions
+        # -- disambiguate somehow
+        # -- only occurs with kanto-johto
+        region = data.regions[-1] if data.regions else None
+        table[group] = (some_gens, all_gens, region)
+    return table
+
+def to_form_table(mons, dex_map):
+    groups = to_game_group_table(dex_map.by_game_group)
+    unknown = (frozenset(), frozenset(), None)
+    def to_info(mon, form):
+        some_gens, all_gens, _ = groups.get(form.game_group, unknown)
+        # Gimick is from their original region
+        origin = mon.forms[0] if has_gimmick(form) else form
+        return FormInfo(
+            first_gen=min(some_gens, default=None),
+            some_gens=some_gens, all_gens=all_gens,
+            first_region=groups.get(origin.game_group, unknown)[2]
         )
+    return {
+        form.form_id: to_info(mon, form)
+        for mon in mons for form in mon.forms
+    }
 
 def id_from_url(url):
     split_url = urlparse(url).path.split('/')
     return int([s for s in split_url if s][-1])
 
-def get_api(root, endpoint, unsure=False):
-    headers = {'content-type': 'application/json'}
-    try:
-        r = requests.get(
-            root + endpoint, headers=headers, timeout=30
-        )
-        return r.json() 
-    except requests.exceptions.RequestException as e:
-        if not unsure:
-            logging.critical(e, exc_info=True)
+def get_api(root, endpoint, unsure=False, fresh=False):
+    url = root + endpoint
+    cache = to_api_cache()
+    entry = cache.lookup(url)
+    # Lists of resources are revalidated every time if fresh
+    is_fresh = entry and not fresh and cache.is_fresh(entry)
+    if entry and (cache.offline or is_fresh):
+        return cache.load(entry)
+    if cache.offline:
+        # Unknown, rather than missing
+        if unsure:
+            raise ApiUnavailable(f'Offline, no cache for {url}')
+        logging.critical('Offline, no cache for %s', url)
         return None
-
-def to_valid_combos(mons, dex_map, type_combos):
+    headers = {
+        'content-type': 'application/json',
+        **cache.validators(entry)
+    }
+    try:
+        r = to_api_client().get(url, headers)
+    except ApiUnavailable:
+        # Serve stale data rather than nothing
+        if entry:
+            return cache.load(entry)
+        raise
+    if r.status_code == 304 and entry:
+        return cache.load(cache.commit(entry))
+    if r.status_code == 404 and not unsure:
+        logging.critical('Not found: %s', url)
+    return cache.store(url, r)
+
+def to_valid_combos(mons, dex_map, type_combos, form_table):
     first_gens = dict()
+    all_gens = list(dex_map.by_generation.keys())
+    gen_limit = max(all_gens) + 1
     for mon in mons:
         for form in mon.forms:
             # All pokemon forms treated as from own generation
             # But we treat gimmicks as from their original regions 
-            gens = list(
-                to_form_generations(dex_map.by_game_group, form, 'SOME')
-            )
-            if len(gens) == 0:
+            info = form_table[form.form_id]
+            if len(info.some_gens) == 0:
                 continue
-            first_region = to_form_region_no_gimmicks(
-                mon, dex_map.by_game_group, form, 'SOME'
-            )
+            first_region = info.first_region
             combo = type_combos[form.type_combo]
             types = list(set(combo))
             # Form has pair of types
@@ -118,11 +137,9 @@ def to_valid_combos(mons, dex_map, type_combos):
                     tuple(sorted([first_region, MONO]))
                 ]
             # Find first generation of pair
-            all_gens = list(dex_map.by_generation.keys())
-            gen_limit = max(all_gens) + 1
             for c in grid_pairs:
                 first_gens[c] = min(
-                    first_gens.get(c, gen_limit), *gens
+                    first_gens.get(c, gen_limit), info.first_gen
                 )
     return {
         gen: sorted([
@@ -132,7 +149,7 @@ def to_valid_combos(mons, dex_map, type_combos):
     } 
 
 def describe_type_combos(api_url):
-    type_results = get_api(api_url, 'type/')['results']
+    type_results = get_api(api_url, 'type/', fresh=True)['results']
     all_types = [ t['name'] for t in type_results ]
     def generate_types(all_types):
         for i,t1 in enumerate(all_types):
@@ -142,6 +159,32 @@ def describe_type_combos(api_url):
     # Ensure no duplicate types
     return sorted(set(generate_types(all_types)))
 
+def to_added_types(old_type_combos, new_type_combos):
+    if not len(old_type_combos):
+        return []
+    old_types = set(t for combo in old_type_combos for t in combo)
+    return sorted(set(
+        t for combo in new_type_combos for t in combo
+        if t not in old_types
+    ))
+
+def describe_type_mon_ids(api_url, type_name):
+    # Pokémon varieties that have the type
+    return [
+        id_from_url(p['pokemon']['url'])
+        for p in get_api(api_url, f'type/{type_name}/')['pokemon']
+    ]
+
+def to_type_combo_map(old_type_combos, new_type_combos):
+    new_index = {
+        tuple(combo): i for i, combo
+        in enumerate(new_type_combos)
+    }
+    return [
+        new_index.get(tuple(combo))
+        for combo in old_type_combos
+    ]
+
 def get_form(form_id, type_combos, mon_id, api_url):
     f = get_api(api_url, f'pokemon-form/{form_id}/')
     type_names = tuple(sorted(set(
@@ -154,27 +197,43 @@ def get_form(form_id, type_combos, mon_id, api_url):
         name, form_id, type_combo, game_group, mon_id
     )
 
-def get_forms(mon_id, type_combos, api_url):
-    return [
-        get_form(
-            id_from_url(p['url']), type_combos, mon_id, api_url
-        )
+def to_map(pool):
+    return pool.map if pool else map
+
+def get_forms(mon_id, type_combos, api_url, form_pool=None):
+    form_ids = [
+        id_from_url(p['url'])
         for p in get_api(
             api_url, f'pokemon/{mon_id}/'
         )['forms']
     ]
+    return list(to_map(form_pool)(
+        lambda form_id: get_form(
+            form_id, type_combos, mon_id, api_url
+        ), form_ids
+    ))
 
-def get_mon(dexn, type_combos, api_url):
+class MonNotFound(LookupError):
+    pass
+
+def get_mon(dexn, type_combos, api_url, pools=(None, None)):
+    variety_pool, form_pool = pools
     pkmn = get_api(api_url, f'pokemon-species/{dexn}/', True)
+    # Only a missing species ends the dex
     if not pkmn:
-        raise ValueError(f'No pokemon #{dexn} found')
-    forms = [
-        form 
+        raise MonNotFound(f'No pokemon #{dexn} found')
+    mon_ids = [
+        id_from_url(v['pokemon']['url'])
         for v in pkmn.get('varieties', [])
-        for form in get_forms(
-            id_from_url(v['pokemon']['url']),
-            type_combos, api_url
+    ]
+    forms = [
+        form
+        for variety_forms in to_map(variety_pool)(
+            lambda mon_id: get_forms(
+                mon_id, type_combos, api_url, form_pool
+            ), mon_ids
         )
+        for form in variety_forms
     ]
     name = pkmn['name']
     return to_mon(dexn, forms, name)
@@ -186,77 +245,77 @@ def yield_alt_forms(mon):
         yield form.form_id, form.name
 
 
-def describe_mon(dexn, type_combos, api_url):
-    mon = get_mon(dexn, type_combos, api_url)
+def describe_mon(dexn, type_combos, api_url, pools=(None, None)):
+    mon = get_mon(dexn, type_combos, api_url, pools)
     return mon.name, mon, list(yield_alt_forms(mon))
 
 
-def to_ngrams(dex_map, mons):
+def to_ngrams(form_table, mons):
+    # Names are searchable from their earliest game
+    search_gens = {
+        mon.id: min(
+            gen for form in mon.forms
+            for gen in form_table[form.form_id].all_gens
+        )
+        for mon in mons
+    }
     three_grams = dict()
     for mon in mons:
-        for max_gen in dex_map.by_generation.keys():
-            gens = list(
-                to_generations(dex_map.by_game_group, mon, 'ALL')
-            )
-            name = mon.name
-            mon_gen = min(gens) 
-            if not mon_gen or mon_gen > max_gen:
-                continue
-            three = three_grams.get(max_gen, {})
-            dex_list = three.get(name[:3], [])
-            three[name[:3]] = dex_list + [
-                mon.id
-            ]
-            three_grams[max_gen] = three
-
+        three_grams.setdefault(mon.name[:3], []).append(mon.id)
+    # Each 2 letter prefix lists its 3 letter prefixes
     two_grams = dict()
-    for max_gen, three in three_grams.items():
-        for k, v in three.items():
-            two = two_grams.get(max_gen, {})
-            two_list = two.get(k[:2], [])
-            two[k[:2]] = two_list + v
-            two_grams[max_gen] = two
-
-    return (three_grams, two_grams)
-
-
-def fill_gen_dicts(**kwargs):
-    mons = kwargs['mons']
-    by_generation = kwargs['dex_map'].by_generation
-    by_game_group = kwargs['dex_map'].by_game_group
-    gen_limit = 1 + max(by_generation.keys())
-    def gen_range(min_gen):
-        return range(min_gen, gen_limit)
-    for mon in mons:
-        mon_origin_gen = min(
-            to_generations(by_game_group, mon, 'SOME')
+    for k in three_grams:
+        two_grams.setdefault(k[:2], []).append(k)
+    return (three_grams, two_grams, search_gens)
+
+
+def to_origin_gens(form_table, mons):
+    mon_gens = {
+        mon.id: min(
+            gen for form in mon.forms
+            for gen in form_table[form.form_id].some_gens
         )
-        for gen in gen_range(mon_origin_gen):
-            gen_dict = kwargs["gen_mon_dict"][gen]
-            gen_dict[mon.id] = mon
-        for form in mon.forms:
-            form_origin_gen = min(
-                to_form_generations(by_game_group, form, 'SOME')
-            )
-            for gen in gen_range(form_origin_gen):
-                gen_dict = kwargs["gen_form_dict"][gen]
-                gen_dict[form.form_id] = form
-    return kwargs
+        for mon in mons
+    }
+    form_gens = {
+        form.form_id: form_table[form.form_id].first_gen
+        for mon in mons for form in mon.forms
+    }
+    return (mon_gens, form_gens)
 
-def read_type_combos():
+def read_data_bundle():
+    try:
+        return read_bundle(CONFIG['BUNDLE'])
+    except FileNotFoundError:
+        return None
+
+def read_type_combos(bundle=None):
+    bundle = bundle or read_data_bundle()
+    if bundle:
+        return bundle.to_json('type_combos')
     try:
         with open(CONFIG['TYPES'], 'r', encoding='utf-8') as f:
             return json.loads(f.read())
     except FileNotFoundError:
         return []
 
-def read_game_list():
+def read_game_list(bundle=None):
+    bundle = bundle or read_data_bundle()
+    if bundle:
+        return bundle.to_json('game_list')
     try:
         with open(CONFIG['GAMES'], 'r', encoding='utf-8') as f:
             return json.loads(f.read())
     except FileNotFoundError:
         return []
 
+def read_main_env(bundle=None):
+    bundle = bundle or read_data_bundle()
+    if bundle:
+        return bundle.to_json('main_env')
+    with open(CONFIG['MAIN_ENV'], 'r', encoding='utf-8') as f:
+        return json.loads(f.read())
+
 def read_form_index_list():
     try:
         yield from read_base15(CONFIG['FORM_INDEX'])
@@ -283,99 +342,150 @@ def read_extra_form_name_dict():
             pass
     return dict(read_list())
 
-@lru_cache()
-def to_config():
-    type_combos = list(read_type_combos())
-    game_list = list(read_game_list())
-    
-    # All mons with their forms
-    mons = list(unpackage_mon_list(
+def read_mon_list(bundle=None):
+    bundle = bundle or read_data_bundle()
+    if bundle:
+        # One Form per snapshot row, so loading stays O(forms)
+        yield from Snapshot(bundle.sections['snapshot']).to_mons()
+        return
+    # Lists saved before data bundles
+    yield from unpackage_mon_list(
         list(read_form_count_list()),
         list(read_form_index_list()),
         read_extra_form_name_dict()
-    ))
+    )
 
-    with open(CONFIG['MAIN_ENV'], 'r', encoding='utf-8') as f:
-        kwargs = json.loads(f.read())
-        kwargs['game_list'] = game_list
-        kwargs['type_combos'] = type_combos
-        dex_map = to_dex_map(kwargs['game_list'])
-        generations = sorted(list(
-            dex_map.by_generation.keys()
-        ))
-
-        # All forms and mons per all max generations
-        kwargs["gen_form_dict"] = {
-            gen: dict() for gen in generations
-        }
-        kwargs["gen_mon_dict"] = {
-            gen: dict() for gen in generations
-        }
-        kwargs["form_mon_dict"] = {
+def to_derived(mons, dex_map, type_combos, form_table):
+    generations = sorted(list(
+        dex_map.by_generation.keys()
+    ))
+    # Origin generation of all forms and mons
+    (mon_gens, form_gens) = to_origin_gens(form_table, mons)
+    # All ids per all 2 or 3 letter name prefixes
+    (three_grams, two_grams, search_gens) = to_ngrams(
+        form_table, mons
+    )
+    return {
+        'generations': generations,
+        'mon_gens': mon_gens,
+        'form_gens': form_gens,
+        'search_gens': search_gens,
+        'three_grams': three_grams,
+        'two_grams': two_grams,
+        'valid_combos': to_valid_combos(
+            mons, dex_map, type_combos, form_table
+        ),
+        'form_mon_dict': {
             form.form_id: mon
             for mon in mons for form in mon.forms
-        }
-        kwargs["mons"] = mons
-        kwargs["dex_map"] = dex_map
-        filled = fill_gen_dicts(**kwargs)
-        kwargs["gen_mon_dict"] = filled['gen_mon_dict']
-        kwargs["gen_form_dict"] = filled['gen_form_dict']
-        # All ids per all 2 or 3 letter name prefixes
-        (three_grams, two_grams) = to_ngrams(
-            dex_map, mons 
-        )
-        kwargs["two_grams"] = two_grams
-        kwargs["three_grams"] = three_grams
-        kwargs["generations"] = generations 
-        kwargs["valid_combos"] = to_valid_combos(
-            mons, dex_map, kwargs['type_combos']
-        )
-        kwargs["mon_name_dict"] = {
-            mon.id: mon.name for mon in mons
-        }
-        # Complete config derived from JSON
-        return Config(
-            MONO=MONO, **kwargs
-        )
+        },
+        'mon_name_dict': {mon.id: mon.name for mon in mons}
+    }
 
-def set_config(**kwargs):
-    extra_form_name_dict = {
-        **kwargs['extra_form_name_dict']
+def to_gen_ends(ids, gens, generations):
+    origin_gens = [gens[i] for i in ids]
+    return {
+        gen: bisect_right(origin_gens, gen)
+        for gen in generations
+    }
+
+def build_config():
+    # One verified bundle for all data
+    bundle = read_data_bundle()
+    type_combos = list(read_type_combos(bundle))
+    game_list = list(read_game_list(bundle))
+    
+    # All mons with their forms
+    mons = list(read_mon_list(bundle))
+    mon_dict = { mon.id: mon for mon in mons }
+    form_dict = {
+        form.form_id: form
+        for mon in mons for form in mon.forms
     }
+
+    kwargs = read_main_env(bundle)
+    kwargs['game_list'] = game_list
+    kwargs['type_combos'] = type_combos
+    dex_map = to_dex_map(kwargs['game_list'])
+    # Generations and regions of every form
+    form_table = to_form_table(mons, dex_map)
+    derived = to_derived(mons, dex_map, type_combos, form_table)
+
+    kwargs["form_dict"] = form_dict
+    kwargs["form_table"] = form_table
+    kwargs["mon_dict"] = mon_dict
+    kwargs["form_gens"] = derived['form_gens']
+    kwargs["mon_gens"] = derived['mon_gens']
+    kwargs["search_gens"] = derived['search_gens']
+    # Mons sorted by origin generation, visible up to an end
+    kwargs["gen_mon_ids"] = sorted(
+        kwargs["mon_gens"], key=kwargs["mon_gens"].get
+    )
+    kwargs["gen_mon_ends"] = to_gen_ends(
+        kwargs["gen_mon_ids"], kwargs["mon_gens"],
+        derived['generations']
+    )
+    kwargs["mon_index"] = {
+        mon.id: i for i, mon in enumerate(mons)
+    }
+    kwargs["form_mon_dict"] = derived['form_mon_dict']
+    kwargs["mons"] = mons
+    kwargs["dex_map"] = dex_map
+    kwargs["two_grams"] = derived['two_grams']
+    kwargs["three_grams"] = derived['three_grams']
+    kwargs["generations"] = derived['generations']
+    kwargs["valid_combos"] = derived['valid_combos']
+    kwargs["mon_name_dict"] = derived['mon_name_dict']
+    kwargs["version"] = bundle.version if bundle else None
+    # Complete config, trusted without validation
+    return Config.construct(
+        MONO=MONO, **kwargs
+    )
+
+class ConfigStore:
+    def __init__(self):
+        self.config = None
+        self.lock = threading.Lock()
+        self.lock_reload = threading.Lock()
+
+    def current(self):
+        # Built on first use, unless loaded in advance
+        if self.config is None:
+            with self.lock:
+                if self.config is None:
+                    self.config = build_config()
+        return self.config
+
+    def swap(self, config):
+        # Requests in flight keep the config they started with
+        self.config = config
+
+@lru_cache()
+def to_config_store():
+    return ConfigStore()
+
+def to_config():
+    return to_config_store().current()
+
+def to_json_bytes(value):
+    return json.dumps(value).encode('utf-8')
+
+def set_config(**kwargs):
     type_combos = [*kwargs['type_combos']]
     game_list = [*kwargs['game_list']]
     mon_list = [*kwargs['mon_list']]
+    # Alternate form names are saved with their forms
     del kwargs['extra_form_name_dict']
     del kwargs['type_combos']
     del kwargs['game_list']
     del kwargs['mon_list']
 
-    form_index_list, form_count_list = (
-        package_form_lists(mon_list)
-    )
-
-    with open(CONFIG['TYPES'], 'w', encoding='utf-8') as f:
-        f.write(json.dumps(type_combos)) 
-    with open(CONFIG['GAMES'], 'w', encoding='utf-8') as f:
-        f.write(json.dumps(game_list)) 
-
-    with open(CONFIG['FORM_NAMES'], 'w', encoding='utf-8') as f:
-        writer = csv.writer(f, delimiter=',')
-        sorted_form_ids = sorted(list(
-            extra_form_name_dict.keys()
-        ))
-        for form_id in sorted_form_ids:
-            name = extra_form_name_dict[form_id]
-            writer.writerow([form_id, name])
-
-    write_base15(CONFIG['FORM_INDEX'], form_index_list)
-
-    with open(CONFIG['FORM_COUNT'], 'w', encoding='utf-8') as f:
-        writer = csv.writer(f, delimiter=',')
-        for name, form_count in form_count_list:
-            writer.writerow([name, form_count])
-    with open(CONFIG['MAIN_ENV'], 'w', encoding='utf-8') as f:
-        f.write(json.dumps(kwargs))
+    write_bundle(CONFIG['BUNDLE'], {
+        'type_combos': to_json_bytes(type_combos),
+        'game_list': to_json_bytes(game_list),
+        'main_env': to_json_bytes(kwargs),
+        'snapshot': package_snapshot(mon_list)
+    })
 
 class Ports(BaseModel):
     client: int
@@ -391,20 +501,31 @@ PackagedMons = List[List[Union[str, int]]]
 
 class Config(BaseSettings):
 
-    three_grams: Dict[int,Dict[str, List[int]]]
-    two_grams: Dict[int,Dict[str, List[int]]]
+    class Config:
+        arbitrary_types_allowed = True
+
+    three_grams: Dict[str, List[int]]
+    two_grams: Dict[str, List[str]]
     mon_name_dict: Dict[int, str]
 
     default_max_gen: int
     valid_combos: Dict[int, Types]
     generations: List[int]
     type_combos: Types 
-    gen_form_dict: Dict[int, Dict[int, Form]]
-    gen_mon_dict: Dict[int, Dict[int, Mon]]
+    form_dict: Dict[int, Form]
+    form_table: Dict[int, FormInfo]
+    mon_dict: Dict[int, Mon]
+    form_gens: Dict[int, int]
+    mon_gens: Dict[int, int]
+    search_gens: Dict[int, int]
+    gen_mon_ids: List[int]
+    gen_mon_ends: Dict[int, int]
+    mon_index: Dict[int, int]
     form_mon_dict: Dict[int, Mon]
     game_list: PackagedGames
     mons: List[Mon]
     dex_map: DexMap
     ports: Ports
     api_url: str
+    version: Union[str, None]
     MONO: str
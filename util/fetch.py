@@ -0,0 +1,89 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+
+# Requests in flight to any one host
+HOST_LIMIT = 16
+RETRY_STATUS = { 429, 500, 502, 503, 504 }
+DONE_STATUS = { 200, 304, 404 }
+
+class ApiUnavailable(ConnectionError):
+    pass
+
+def to_retry_after(response):
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class ApiClient:
+    def __init__(
+        self, host_limit=HOST_LIMIT, retries=5,
+        backoff=0.5, max_backoff=30, timeout=30
+    ):
+        self.host_limit = host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.lock_hosts = threading.Lock()
+        self.hosts = {}
+        # Keep-alive connections shared by all threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=host_limit
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def to_host_slots(self, url):
+        host = urlparse(url).netloc
+        with self.lock_hosts:
+            if host not in self.hosts:
+                self.hosts[host] = threading.BoundedSemaphore(
+                    self.host_limit
+                )
+            return self.hosts[host]
+
+    def to_delay(self, attempt, response=None):
+        # Exponential backoff with full jitter
+        limit = min(self.max_backoff, self.backoff * 2**attempt)
+        delay = random.uniform(0, limit)
+        retry_after = (
+            to_retry_after(response)
+            if response is not None else None
+        )
+        return max(delay, retry_after or 0)
+
+    def get(self, url, headers=None):
+        last = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.to_delay(attempt - 1, last))
+            try:
+                with self.to_host_slots(url):
+                    r = self.session.get(
+                        url, headers=headers, timeout=self.timeout
+                    )
+            except requests.exceptions.RequestException as e:
+                logging.warning('Retrying %s: %s', url, e)
+                last = None
+                continue
+            if r.status_code in DONE_STATUS:
+                return r
+            if r.status_code not in RETRY_STATUS:
+                break
+            logging.warning('Retrying %s: %s', url, r.status_code)
+            last = r
+        raise ApiUnavailable(
+            f'Unable to get {url} after {attempt + 1} attempts'
+        )
+
+@lru_cache()
+def to_api_client():
+    return ApiClient()
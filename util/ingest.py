@@ -0,0 +1,84 @@
+import sys
+import time
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .config import describe_mon, MonNotFound
+
+# Species, variety, and form requests in flight per stage
+WORKERS = 16
+
+class Progress:
+    def __init__(self, every=1.0):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.every = every
+        self.mons = 0
+        self.forms = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def rate(self, count):
+        return count / max(self.elapsed, 1e-9)
+
+    def update(self, mon):
+        self.mons += 1
+        self.forms += len(mon.forms)
+        now = time.perf_counter()
+        if now - self.last < self.every:
+            return
+        self.last = now
+        self.report()
+
+    def report(self, prefix='Ingest'):
+        print(
+            f'{prefix}: {self.mons} Pokémon, {self.forms} forms',
+            f'in {self.elapsed:.1f}s',
+            f'({self.rate(self.mons):.1f} Pokémon/s,',
+            f'{self.rate(self.forms):.1f} forms/s)',
+            flush=True, file=sys.stderr
+        )
+
+def to_pools(workers):
+    return tuple(
+        ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name
+        )
+        for name in ['species', 'variety', 'form']
+    )
+
+def describe_mons(dexns, type_combos, api_url, workers=WORKERS):
+    pools = to_pools(workers)
+    progress = Progress()
+    def submit(dexn):
+        species_pool, *mon_pools = pools
+        return species_pool.submit(
+            describe_mon, dexn, type_combos, api_url,
+            tuple(mon_pools)
+        )
+    # Sliding window of species, yielded in dex order
+    dexns = iter(dexns)
+    window = deque(
+        (dexn, submit(dexn))
+        for dexn in islice(dexns, workers)
+    )
+    try:
+        while window:
+            dexn, future = window.popleft()
+            try:
+                # Name, mon, and extra forms
+                found = future.result()
+            except MonNotFound:
+                break
+            for next_dexn in islice(dexns, 1):
+                window.append((next_dexn, submit(next_dexn)))
+            progress.update(found[1])
+            yield (dexn, *found)
+    finally:
+        for _, future in window:
+            future.cancel()
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+        progress.report('Ingested')
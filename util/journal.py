@@ -0,0 +1,62 @@
+import os
+import json
+from contextlib import contextmanager
+from models import (
+    unpackage_mon, package_form_lists
+)
+from .config import CONFIG
+
+def to_entry(dexn, mon, extra_forms):
+    form_index_list, _ = package_form_lists([mon])
+    return {
+        'dexn': dexn,
+        'name': mon.name,
+        'forms': form_index_list,
+        'extra_forms': [list(f) for f in extra_forms]
+    }
+
+def from_entry(entry):
+    extra_forms = [tuple(f) for f in entry['extra_forms']]
+    mon = unpackage_mon(
+        entry['name'], entry['forms'], dict(extra_forms)
+    )
+    return entry['dexn'], mon, extra_forms
+
+def read_journal(path=CONFIG['JOURNAL']):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final write from an interrupted run
+                    break
+                yield from_entry(entry)
+    except FileNotFoundError:
+        pass
+
+def clear_journal(path=CONFIG['JOURNAL']):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def repair_journal(path):
+    # Drop any torn final write before appending
+    try:
+        with open(path, 'rb+') as f:
+            data = f.read()
+            f.truncate(data.rfind(b'\n') + 1)
+    except FileNotFoundError:
+        pass
+
+@contextmanager
+def open_journal(path=CONFIG['JOURNAL']):
+    repair_journal(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        def append(dexn, mon, extra_forms):
+            entry = to_entry(dexn, mon, extra_forms)
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        yield append
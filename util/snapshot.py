@@ -0,0 +1,108 @@
+import sys
+import struct
+from array import array
+from itertools import accumulate
+from models import to_form, to_mon
+
+MAGIC = b'TKTSNAP\0'
+VERSION = 1
+# Magic, version, form count, mon count
+HEADER = struct.Struct('<8sIII')
+# Fixed width columns, one value per form
+COLUMNS = ('form_id', 'type_combo', 'game_group', 'mon_id')
+
+def to_int32(values):
+    column = array('i', values)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+def to_string_table(strings):
+    blobs = [s.encode('utf-8') for s in strings]
+    offsets = to_int32(accumulate(
+        (len(b) for b in blobs), initial=0
+    ))
+    return offsets, b''.join(blobs)
+
+def package_snapshot(mon_list):
+    forms = [form for mon in mon_list for form in mon.forms]
+    columns = [
+        to_int32(getattr(form, key) for form in forms)
+        for key in COLUMNS
+    ]
+    # Exclusive end of each mon's forms
+    mon_ends = to_int32(accumulate(
+        len(mon.forms) for mon in mon_list
+    ))
+    # Default forms are named after their mon
+    offsets, blob = to_string_table([
+        *(
+            name for mon in mon_list for name in [mon.name] + [
+                form.name for form in mon.forms[1:]
+            ]
+        ),
+        *(mon.name for mon in mon_list)
+    ])
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, len(forms), len(mon_list)),
+        *(column.tobytes() for column in columns),
+        mon_ends.tobytes(), offsets.tobytes(), blob
+    ])
+
+class Snapshot:
+    # Storage format only, as to_mons builds every form
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        magic, version, n_forms, n_mons = HEADER.unpack_from(
+            self.buffer
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Unknown snapshot {magic} v{version}')
+        self.n_forms = n_forms
+        self.n_mons = n_mons
+        start = HEADER.size
+        def take(n):
+            nonlocal start
+            view = self.buffer[start:start + 4*n]
+            start += 4*n
+            if sys.byteorder == 'little':
+                return view.cast('i')
+            column = array('i', view.tobytes())
+            column.byteswap()
+            return column
+        # In the order of COLUMNS
+        self.form_id = take(n_forms)
+        self.type_combo = take(n_forms)
+        self.game_group = take(n_forms)
+        self.mon_id = take(n_forms)
+        self.mon_ends = take(n_mons)
+        self.offsets = take(n_forms + n_mons + 1)
+        self.strings = self.buffer[start:]
+
+    def to_string(self, i):
+        return str(
+            self.strings[self.offsets[i]:self.offsets[i+1]],
+            'utf-8'
+        )
+
+    def form_name(self, i):
+        return self.to_string(i)
+
+    def mon_name(self, j):
+        return self.to_string(self.n_forms + j)
+
+    def mon_range(self, j):
+        start = self.mon_ends[j-1] if j else 0
+        return range(start, self.mon_ends[j])
+
+    def to_form(self, i):
+        return to_form(
+            self.form_name(i), self.form_id[i],
+            self.type_combo[i], self.game_group[i],
+            self.mon_id[i]
+        )
+
+    def to_mons(self):
+        for j in range(self.n_mons):
+            forms = [self.to_form(i) for i in self.mon_range(j)]
+            yield to_mon(forms[0].form_id, forms, self.mon_name(j))
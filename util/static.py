@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+def to_etag(body, suffix=''):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}{suffix}"'
+
+def to_codings(accept_encoding):
+    return [
+        coding.split(';')[0].strip().lower()
+        for coding in (accept_encoding or '').split(',')
+    ]
+
+def is_match(if_none_match, etag):
+    tags = [
+        tag.strip().removeprefix('W/')
+        for tag in (if_none_match or '').split(',')
+    ]
+    return '*' in tags or etag in tags
+
+class StaticEntry:
+    __slots__ = ('body', 'etag', 'gzip_body', 'gzip_etag')
+
+    def __init__(self, content):
+        # Rendered as FastAPI would render the content
+        self.body = JSONResponse(jsonable_encoder(content)).body
+        self.etag = to_etag(self.body)
+        self.gzip_body = gzip.compress(self.body, mtime=0)
+        self.gzip_etag = to_etag(self.body, '-gzip')
+
+class StaticCache:
+    def __init__(self, size=2):
+        self.size = size
+        self.configs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def to_entries(self, config):
+        # Entries only last as long as their data
+        key = id(config)
+        found = self.configs.get(key)
+        if found and found[0] is config:
+            self.configs.move_to_end(key)
+            return found[1]
+        entries = {}
+        self.configs[key] = (config, entries)
+        # Previous entries stay, for requests in flight
+        while len(self.configs) > self.size:
+            self.configs.popitem(last=False)
+        return entries
+
+    def to_entry(self, config, key, to_content):
+        with self.lock:
+            entry = self.to_entries(config).get(key)
+        if entry is None:
+            entry = StaticEntry(to_content())
+            with self.lock:
+                self.to_entries(config)[key] = entry
+        return entry
+
+    def respond(self, request, config, key, to_content):
+        entry = self.to_entry(config, key, to_content)
+        body, etag = entry.body, entry.etag
+        headers = {}
+        if 'gzip' in to_codings(request.headers.get('accept-encoding')):
+            body, etag = entry.gzip_body, entry.gzip_etag
+            headers['content-encoding'] = 'gzip'
+        headers.update({
+            'etag': etag, 'vary': 'Accept-Encoding',
+            # Always revalidate, as data can be reloaded
+            'cache-control': 'no-cache'
+        })
+        if is_match(request.headers.get('if-none-match'), etag):
+            headers.pop('content-encoding', None)
+            return Response(status_code=304, headers=headers)
+        return Response(
+            body, media_type='application/json', headers=headers
+        )
+
+@lru_cache()
+def to_static_cache():
+    return StaticCache()
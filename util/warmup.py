@@ -0,0 +1,31 @@
+import sys
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.version = None
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        self.phases[name] = time.perf_counter() - start
+        print(
+            f'Warmed up {name} in {self.phases[name]:.3f}s',
+            flush=True, file=sys.stderr
+        )
+
+    def to_status(self):
+        return {
+            'ready': self.ready,
+            'version': self.version,
+            'phases': { **self.phases }
+        }
+
+@lru_cache()
+def to_readiness():
+    return Readiness()